@@ -4,6 +4,7 @@ from __future__ import annotations
 
 import json
 import logging
+from collections.abc import Iterator
 from typing import Any
 
 from backend.config import Config
@@ -132,9 +133,61 @@ class SupervisorAgent:
 		"""
 		intent = self.route_query(user_query)
 		routed = intent.get("routed_agents", [])
-		entities = intent.get("entities", {})
-		agent_responses: list[dict[str, Any]] = []
+		agent_responses = self._run_agents(routed, user_query, intent.get("entities", {}), memory_context)
+
+		# If routed to "supervisor" (general query), answer directly with RAG
+		if not agent_responses or "supervisor" in routed:
+			general_resp = self._answer_general(user_query, memory_context=memory_context)
+			agent_responses.append(general_resp)
+
+		# Synthesize final response
+		texts = [r.get("text", "") for r in agent_responses if r.get("text")]
+		final_response = self.synthesize_response(texts)
+
+		return {
+			"intent": intent,
+			"agent_responses": agent_responses,
+			"response": final_response,
+			"sources": self._collect_sources(agent_responses),
+		}
 
+	def handle_query_stream(self, user_query: str, memory_context: str = "") -> dict[str, Any]:
+		"""Like :meth:`handle_query`, but the final answer is an iterator of text pieces.
+
+		Specialist agents still run to completion first; only the last LLM
+		call (the general answer when nothing else was routed, otherwise the
+		synthesis) is streamed.  Returns the same keys as ``handle_query``
+		with ``"stream"`` in place of ``"response"``.
+		"""
+		intent = self.route_query(user_query)
+		routed = intent.get("routed_agents", [])
+		agent_responses = self._run_agents(routed, user_query, intent.get("entities", {}), memory_context)
+
+		if not agent_responses:
+			prompt, sources = self._general_prompt(user_query, memory_context)
+			return {
+				"intent": intent,
+				"agent_responses": [],
+				"stream": llm.generate_stream(prompt, role="agent"),
+				"sources": sources,
+			}
+
+		if "supervisor" in routed:
+			agent_responses.append(self._answer_general(user_query, memory_context=memory_context))
+
+		texts = [r.get("text", "") for r in agent_responses if r.get("text")]
+		return {
+			"intent": intent,
+			"agent_responses": agent_responses,
+			"stream": self.synthesize_stream(texts),
+			"sources": self._collect_sources(agent_responses),
+		}
+
+	def _run_agents(
+		self, routed: list[str], user_query: str, entities: dict[str, Any], memory_context: str
+	) -> list[dict[str, Any]]:
+		"""Call each routed specialist; a failing agent contributes an apology."""
+		agent_responses: list[dict[str, Any]] = []
 		for agent_name in routed:
 			try:
 				result = self._dispatch(agent_name, user_query, entities, memory_context=memory_context)
@@ -147,17 +200,11 @@ class SupervisorAgent:
 					"text": f"Sorry, {agent_name.replace('_', ' ')} encountered an error.",
 					"sources": [],
 				})
+		return agent_responses
 
-		# If routed to "supervisor" (general query), answer directly with RAG
-		if not agent_responses or "supervisor" in routed:
-			general_resp = self._answer_general(user_query, memory_context=memory_context)
-			agent_responses.append(general_resp)
-
-		# Synthesize final response
-		texts = [r.get("text", "") for r in agent_responses if r.get("text")]
-		final_response = self.synthesize_response(texts)
-
-		# Collect all sources
+	@staticmethod
+	def _collect_sources(agent_responses: list[dict[str, Any]]) -> list[str]:
+		"""All agents' sources as strings, deduplicated in first-seen order."""
 		all_sources: list[str] = []
 		for r in agent_responses:
 			for s in r.get("sources", []):
@@ -165,14 +212,7 @@ class SupervisorAgent:
 					all_sources.append(s)
 				else:
 					all_sources.append(str(s))
-		unique_sources = list(dict.fromkeys(all_sources))  # preserve order, deduplicate
-
-		return {
-			"intent": intent,
-			"agent_responses": agent_responses,
-			"response": final_response,
-			"sources": unique_sources,
-		}
+		return list(dict.fromkeys(all_sources))  # preserve order, deduplicate
 
 	# ── Agent dispatch ─────────────────────────────────────────────────
 
@@ -259,6 +299,16 @@ class SupervisorAgent:
 
 	def _answer_general(self, query: str, memory_context: str = "") -> dict[str, Any]:
 		"""Answer a general agricultural question using RAG context + memory."""
+		prompt, sources = self._general_prompt(query, memory_context)
+		response_text = llm.generate(prompt, role="agent")
+		return {
+			"agent": "supervisor",
+			"text": response_text,
+			"sources": sources,
+		}
+
+	def _general_prompt(self, query: str, memory_context: str = "") -> tuple[str, list[str]]:
+		"""Build the general-answer prompt; returns ``(prompt, unique_sources)``."""
 		rag_context = ""
 		sources: list[str] = []
 		if self._rag:
@@ -292,12 +342,7 @@ class SupervisorAgent:
 			f"{memory_block}"
 			f"Farmer's question: {query}"
 		)
-		response_text = llm.generate(prompt, role="agent")
-		return {
-			"agent": "supervisor",
-			"text": response_text,
-			"sources": list(dict.fromkeys(sources)),
-		}
+		return prompt, list(dict.fromkeys(sources))
 
 	# ── Synthesis ─────────────────────────────────────────────────────
 
@@ -307,8 +352,18 @@ class SupervisorAgent:
 			return "Sorry, I could not find relevant information at this time. Please try rephrasing your question."
 		if len(agent_responses) == 1:
 			return agent_responses[0]
-
-		prompt = (
+		return llm.generate(self._synthesis_prompt(agent_responses), role="synthesis")
+
+	def synthesize_stream(self, agent_responses: list[str]) -> Iterator[str]:
+		"""Streaming :meth:`synthesize_response`; a single response is yielded whole."""
+		if len(agent_responses) < 2:
+			yield self.synthesize_response(agent_responses)
+			return
+		yield from llm.generate_stream(self._synthesis_prompt(agent_responses), role="synthesis")
+
+	@staticmethod
+	def _synthesis_prompt(agent_responses: list[str]) -> str:
+		return (
 			"You are the KrishiSaathi Supervisor Agent. Combine the following specialist responses "
 			"into a single, clear, farmer-friendly answer.\n"
 			"Rules:\n"
@@ -318,7 +373,6 @@ class SupervisorAgent:
 			"- Keep the language simple and practical\n\n"
 			+ "\n\n---\n\n".join(agent_responses)
 		)
-		return llm.generate(prompt, role="synthesis")
 
 	# ── Helpers ────────────────────────────────────────────────────────
 
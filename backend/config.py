@@ -2,8 +2,9 @@
 
 from __future__ import annotations
 
-import json
 import os
+
+import orjson
 from dotenv import load_dotenv
 import streamlit as st
 
@@ -67,6 +68,16 @@ class Config:
     LLM_MAX_RETRIES: int = int(os.getenv("LLM_MAX_RETRIES", "3"))
     LLM_RETRY_BASE_DELAY: int = int(os.getenv("LLM_RETRY_BASE_DELAY", "10"))
     LLM_CACHE_SIZE: int = int(os.getenv("LLM_CACHE_SIZE", "128"))
+    # Per-request timeout (seconds) by role — a hung call falls through to
+    # the next model in the chain instead of blocking for the SDK default
+    LLM_REQUEST_TIMEOUT: dict[str, float] = {
+        "classifier": float(os.getenv("LLM_TIMEOUT_CLASSIFIER", "15")),
+        "agent": float(os.getenv("LLM_TIMEOUT_AGENT", "45")),
+        "synthesis": float(os.getenv("LLM_TIMEOUT_SYNTHESIS", "45")),
+    }
+    # Client-side pacing for all Gemini calls (LLM + embeddings); 0 disables
+    GEMINI_RPM: int = int(os.getenv("GEMINI_RPM", "60"))
+    GEMINI_TPM: int = int(os.getenv("GEMINI_TPM", "1000000"))
 
     # App Settings
     APP_NAME: str = "KrishiSaathi"
@@ -98,7 +109,7 @@ class Config:
     elif isinstance(_admin_raw, str) and _admin_raw.strip():
         ADMIN_EMAILS = [
             e.strip().lower()
-            for e in (json.loads(_admin_raw) if _admin_raw.startswith("[") else _admin_raw.split(","))
+            for e in (orjson.loads(_admin_raw) if _admin_raw.startswith("[") else _admin_raw.split(","))
             if e.strip()
         ]
     else:
@@ -134,8 +145,8 @@ class Config:
         # 2. Fallback: local JSON (works in dev / offline)
         try:
             if os.path.exists(cls.ADMIN_SETTINGS_FILE):
-                with open(cls.ADMIN_SETTINGS_FILE, "r", encoding="utf-8") as f:
-                    return json.load(f)
+                with open(cls.ADMIN_SETTINGS_FILE, "rb") as f:
+                    return orjson.loads(f.read())
         except Exception:
             pass
         return {}
@@ -163,8 +174,8 @@ class Config:
         """Write settings to local JSON file (best-effort)."""
         try:
             os.makedirs(os.path.dirname(cls.ADMIN_SETTINGS_FILE), exist_ok=True)
-            with open(cls.ADMIN_SETTINGS_FILE, "w", encoding="utf-8") as f:
-                json.dump(settings, f, indent=2, ensure_ascii=False)
+            with open(cls.ADMIN_SETTINGS_FILE, "wb") as f:
+                f.write(orjson.dumps(settings, option=orjson.OPT_INDENT_2))
         except Exception:
             pass  # read-only filesystem — that's OK
 
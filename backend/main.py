@@ -3,7 +3,7 @@
 Provides a single ``KrishiSaathi`` facade class that:
 1. Initialises the RAG engine (ChromaDB + Gemini embeddings).
 2. Creates the SupervisorAgent with RAG injected.
-3. Exposes ``ask(query)`` for the frontend / CLI to call.
+3. Exposes ``ask(query)`` / ``ask_stream(query)`` for the frontend / CLI to call.
 """
 
 from __future__ import annotations
@@ -62,6 +62,16 @@ class KrishiSaathi:
         """
         return self._supervisor.handle_query(query, memory_context=memory_context)
 
+    def ask_stream(self, query: str, user_id: str | None = None, memory_context: str = "") -> dict[str, Any]:
+        """Like :meth:`ask`, but the answer arrives as it is generated.
+
+        Returns
+        -------
+        dict with the same keys as :meth:`ask`, except ``stream`` (an
+        iterator of text pieces, consumed once) replaces ``response``.
+        """
+        return self._supervisor.handle_query_stream(query, memory_context=memory_context)
+
     @property
     def rag(self) -> RAGEngine | None:
         """Expose RAG engine for direct access (e.g. admin tools)."""
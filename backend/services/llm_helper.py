@@ -4,10 +4,15 @@ Every agent calls ``llm.generate(...)`` instead of touching API clients directly
 This gives us:
   - **Dual backend**: Groq (fast, generous free tier) → Gemini (fallback)
   - Automatic retry with exponential backoff on transient 429 errors
+  - Gemini calls paced by the shared client-side token bucket (rate_limit.py)
   - Hard-block detection (``limit: 0``) → instant fallback, no wasted retries
   - Model fallback chains within each backend
   - In-memory LRU response cache
+  - Concurrent identical prompts share a single upstream call
+  - Static system prompts sent separately (Gemini context cache when large enough)
+  - JSON mode with a response schema for structured output
   - Role-based model selection (classifier / agent / synthesis)
+  - Token streaming (``generate_stream``) for chat replies
   - Multimodal support (images → Gemini only)
   - Single place to swap models for production
 
@@ -17,17 +22,30 @@ Usage:
     text = llm.generate("Your prompt here", role="agent")
     text = llm.generate("Classify intent", role="classifier")
     text = llm.generate([prompt, pil_image], role="agent", use_cache=False)  # multimodal
+    text = llm.generate(dynamic_part, role="classifier", system=STATIC_RULES)
+    raw = llm.generate(prompt, role="classifier", response_schema=SCHEMA)  # JSON text
+    for delta in llm.generate_stream(prompt, role="synthesis"): ...
 """
 
 from __future__ import annotations
 
 import hashlib
+import itertools
+import json
 import logging
+import math
+import sys
+import threading
 import time
 from collections import OrderedDict
-from typing import Any
+from collections.abc import Iterator
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from datetime import timedelta
+from typing import Any, Protocol
 
 from backend.config import Config
+from backend.services.rate_limit import gemini_bucket
 
 logger = logging.getLogger(__name__)
 
@@ -48,6 +66,49 @@ except ImportError:
     logger.debug("google-generativeai not installed — Gemini backend disabled")
 
 
+# Generation settings, built once and shared by every call
+_GROQ_GEN_KWARGS: dict[str, Any] = {"temperature": 0.3, "max_tokens": 2048}
+_GEMINI_GENERATION_CONFIG: dict[str, Any] = {"temperature": 0.3, "max_output_tokens": 2048}
+_DEFAULT_TIMEOUT = 45.0  # seconds, for roles missing from Config.LLM_REQUEST_TIMEOUT
+_CONTEXT_CACHE_TTL = 3600.0  # seconds a Gemini cached system prompt lives
+# Exception names the SDKs raise when a request runs out of time
+_TIMEOUT_ERRORS = frozenset({"DeadlineExceeded", "APITimeoutError", "ReadTimeout", "TimeoutException"})
+
+
+def _is_timeout(exc: Exception) -> bool:
+    """True when *exc* is a request timeout (client- or server-side)."""
+    if isinstance(exc, TimeoutError) or type(exc).__name__ in _TIMEOUT_ERRORS:
+        return True
+    err = str(exc)
+    return "504" in err or "Deadline Exceeded" in err
+
+
+@dataclass(slots=True)
+class _ModelState:
+    """Runtime state for one model, keyed by ``"backend:name"``."""
+
+    name: str
+    backend: str
+    gemini_obj: Any = None       # pre-built GenerativeModel (Gemini only)
+    blocked_until: float = 0.0   # monotonic deadline; ``inf`` = until reload
+    # system prompt → (GenerativeModel, monotonic expiry) (Gemini only)
+    system_models: dict[str, tuple[Any, float]] = field(default_factory=dict)
+
+
+def _primed(chunks: Iterator[str]) -> Iterator[str]:
+    """Pull the first non-empty piece of *chunks* now.
+
+    Connection, quota and timeout errors surface on the first read, so doing
+    it here keeps them inside the retry / fallback loop instead of raising
+    halfway through a reply the user is already reading.
+    """
+    for first in chunks:
+        first = first.lstrip()
+        if first:
+            return itertools.chain((first,), chunks)
+    return iter(())
+
+
 class _HardBlock(Exception):
     """Raised when a model returns limit:0 — no point retrying."""
     pass
@@ -58,6 +119,187 @@ class _BackendExhausted(Exception):
     pass
 
 
+class _Backend(Protocol):
+    """One provider's call + error classification; the retry loop is shared."""
+
+    name: str           # key prefix in ``LLMHelper._models``
+    label: str          # for log lines
+    default_model: str  # used for roles with no fallback chain
+
+    def call(
+        self,
+        state: _ModelState,
+        prompt: str | list[Any],
+        timeout: float,
+        system: str | None,
+        schema: dict[str, Any] | None,
+    ) -> str: ...
+
+    def stream(
+        self,
+        state: _ModelState,
+        prompt: str | list[Any],
+        timeout: float,
+        system: str | None,
+        schema: dict[str, Any] | None,
+    ) -> Iterator[str]: ...
+
+    def is_rate_limit(self, err: str) -> bool: ...
+
+
+class _GroqBackend:
+    name = "groq"
+    label = "Groq"
+    default_model = "llama-3.3-70b-versatile"
+
+    def __init__(self, client: Groq | None) -> None:
+        self._client = client
+
+    def call(
+        self,
+        state: _ModelState,
+        prompt: str | list[Any],
+        timeout: float,
+        system: str | None,
+        schema: dict[str, Any] | None,
+    ) -> str:
+        response = self._create(state, prompt, timeout, system, schema)
+        return response.choices[0].message.content.strip()
+
+    def stream(
+        self,
+        state: _ModelState,
+        prompt: str | list[Any],
+        timeout: float,
+        system: str | None,
+        schema: dict[str, Any] | None,
+    ) -> Iterator[str]:
+        response = self._create(state, prompt, timeout, system, schema, stream=True)
+        return _primed(
+            chunk.choices[0].delta.content or "" for chunk in response if chunk.choices
+        )
+
+    def _create(
+        self,
+        state: _ModelState,
+        prompt: str | list[Any],
+        timeout: float,
+        system: str | None,
+        schema: dict[str, Any] | None,
+        **extra: Any,
+    ) -> Any:
+        messages: tuple[dict[str, Any], ...] = ({"role": "user", "content": prompt},)
+        if system:
+            messages = ({"role": "system", "content": system},) + messages
+        # Groq's JSON mode only guarantees an object; arrays rely on the prompt
+        if schema and schema.get("type", "").upper() == "OBJECT":
+            extra["response_format"] = {"type": "json_object"}
+        return self._client.chat.completions.create(
+            model=state.name,
+            messages=messages,
+            timeout=timeout,
+            **_GROQ_GEN_KWARGS,
+            **extra,
+        )
+
+    @staticmethod
+    def is_rate_limit(err: str) -> bool:
+        return "429" in err or "rate_limit" in err.lower()
+
+
+class _GeminiBackend:
+    name = "gemini"
+    label = "Gemini"
+    default_model = "gemini-2.0-flash"
+
+    def call(
+        self,
+        state: _ModelState,
+        prompt: str | list[Any],
+        timeout: float,
+        system: str | None,
+        schema: dict[str, Any] | None,
+    ) -> str:
+        model, kwargs, est_tokens = self._request(state, prompt, timeout, system, schema)
+        with gemini_bucket.acquire(est_tokens=est_tokens):
+            response = model.generate_content(prompt, **kwargs)
+        return response.text.strip()
+
+    def stream(
+        self,
+        state: _ModelState,
+        prompt: str | list[Any],
+        timeout: float,
+        system: str | None,
+        schema: dict[str, Any] | None,
+    ) -> Iterator[str]:
+        model, kwargs, est_tokens = self._request(state, prompt, timeout, system, schema)
+        with gemini_bucket.acquire(est_tokens=est_tokens):
+            response = model.generate_content(prompt, stream=True, **kwargs)
+            # Chunks without parts (e.g. a trailing safety rating) have no .text
+            return _primed(chunk.text for chunk in response if chunk.parts)
+
+    def _request(
+        self,
+        state: _ModelState,
+        prompt: str | list[Any],
+        timeout: float,
+        system: str | None,
+        schema: dict[str, Any] | None,
+    ) -> tuple[Any, dict[str, Any], int]:
+        """Model, ``generate_content`` kwargs and token estimate for one call."""
+        model = self._model_for(state, system) if system else state.gemini_obj
+        kwargs: dict[str, Any] = {"request_options": {"timeout": timeout}}
+        if schema:
+            kwargs["generation_config"] = {
+                **_GEMINI_GENERATION_CONFIG,
+                "response_mime_type": "application/json",
+                "response_schema": schema,
+            }
+        text_len = len(prompt) if isinstance(prompt, str) else sum(
+            len(p) for p in prompt if isinstance(p, str)
+        )
+        return model, kwargs, (text_len + len(system or "")) // 4
+
+    @staticmethod
+    def _model_for(state: _ModelState, system: str) -> Any:
+        """GenerativeModel with *system* as its instruction, built once per prompt.
+
+        Tries Gemini context caching first so the static prefix isn't billed
+        on every call; prompts under the model's minimum cacheable size (or
+        models without caching) fall back to a plain ``system_instruction``.
+        """
+        entry = state.system_models.get(system)
+        now = time.monotonic()
+        if entry is not None and entry[1] > now:
+            return entry[0]
+        try:
+            cached = genai.caching.CachedContent.create(
+                model=state.name,
+                system_instruction=system,
+                ttl=timedelta(seconds=_CONTEXT_CACHE_TTL),
+            )
+            model = genai.GenerativeModel.from_cached_content(
+                cached, generation_config=_GEMINI_GENERATION_CONFIG
+            )
+            # Rebuild a minute early so a request never races the expiry
+            expires = now + _CONTEXT_CACHE_TTL - 60
+        except Exception as exc:
+            logger.debug("Context cache unavailable for %s: %s", state.name, exc)
+            model = genai.GenerativeModel(
+                state.name,
+                system_instruction=system,
+                generation_config=_GEMINI_GENERATION_CONFIG,
+            )
+            expires = math.inf
+        state.system_models[system] = (model, expires)
+        return model
+
+    @staticmethod
+    def is_rate_limit(err: str) -> bool:
+        return "429" in err or "ResourceExhausted" in err
+
+
 class LLMHelper:
     """Dual-backend LLM wrapper: Groq (primary) + Gemini (fallback)."""
 
@@ -67,11 +309,14 @@ class LLMHelper:
         # ── Groq setup ──
         self._groq_client: Groq | None = None
         if _groq_available and Config.GROQ_API_KEY:
-            self._groq_client = Groq(api_key=Config.GROQ_API_KEY)
+            # SDK-level retries off: _call_with_retries owns the retry policy
+            self._groq_client = Groq(api_key=Config.GROQ_API_KEY, max_retries=0)
+        self._groq = _GroqBackend(self._groq_client)
 
         # ── Gemini setup ──
         if _gemini_available and Config.GEMINI_API_KEY:
             genai.configure(api_key=Config.GEMINI_API_KEY)
+        self._gemini = _GeminiBackend()
 
         # Role → model name for each backend
         self._groq_model_map: dict[str, str] = {
@@ -85,21 +330,23 @@ class LLMHelper:
             "synthesis": Config.MODEL_SYNTHESIS,
         }
 
-        # Fallback chains per backend
-        self._groq_fallback: dict[str, list[str]] = Config.GROQ_FALLBACK_CHAIN
-        self._gemini_fallback: dict[str, list[str]] = Config.GEMINI_FALLBACK_CHAIN
-
-        # Track hard-blocked models per session (prefixed by backend)
-        self._blocked_models: set[str] = set()
-
-        # Lazy Gemini GenerativeModel cache
-        self._gemini_models: dict[str, Any] = {}
+        # All per-model state lives in one dict keyed by "backend:name";
+        # (backend, role) → ordered list of those keys is the fallback chain.
+        # Gemini GenerativeModel objects are built eagerly here.
+        self._models: dict[str, _ModelState] = {}
+        self._chain: dict[tuple[str, str], list[str]] = {}
+        self._build_model_state()
 
         # LRU response cache
         self._cache: OrderedDict[str, str] = OrderedDict()
         self._cache_size = Config.LLM_CACHE_SIZE
         self._max_retries = Config.LLM_MAX_RETRIES
         self._base_delay = Config.LLM_RETRY_BASE_DELAY
+        self._timeouts: dict[str, float] = dict(Config.LLM_REQUEST_TIMEOUT)
+
+        # Concurrent identical prompts share one upstream call
+        self._lock = threading.Lock()
+        self._inflight: dict[str, Future] = {}
 
         primary_map = self._groq_model_map if self._backend == "groq" else self._gemini_model_map
         logger.info(
@@ -119,6 +366,8 @@ class LLMHelper:
         *,
         role: str = "agent",
         use_cache: bool = True,
+        system: str | None = None,
+        response_schema: dict[str, Any] | None = None,
     ) -> str:
         """Generate a text response.
 
@@ -131,36 +380,116 @@ class LLMHelper:
             One of ``"classifier"``, ``"agent"``, ``"synthesis"``.
         use_cache : bool
             If True, identical prompts return cached responses.
+        system : str, optional
+            Static instructions sent as the system prompt.  Keep per-request
+            content in *prompt* so this prefix stays identical (and cacheable)
+            across calls.
+        response_schema : dict, optional
+            OpenAPI-style schema; switches the backend to JSON mode so the
+            returned text is JSON (Gemini enforces the schema, Groq only
+            objects).  Callers should still parse defensively.
         """
-        cache_key = self._cache_key(prompt, role) if use_cache else None
+        cache_key = (
+            self._cache_key(prompt, role, system, response_schema) if use_cache else None
+        )
 
-        # Check cache
-        if cache_key and cache_key in self._cache:
-            logger.debug("Cache HIT for role=%s", role)
-            self._cache.move_to_end(cache_key)
-            return self._cache[cache_key]
+        if not cache_key:
+            return self._dispatch(prompt, role, system, response_schema)
+
+        # Check cache, then join an identical in-flight request if one exists
+        with self._lock:
+            if cache_key in self._cache:
+                logger.debug("Cache HIT for role=%s", role)
+                self._cache.move_to_end(cache_key)
+                return self._cache[cache_key]
+            future = self._inflight.get(cache_key)
+            is_owner = future is None
+            if is_owner:
+                future = self._inflight[cache_key] = Future()
+
+        if not is_owner:
+            logger.debug("Joining in-flight request for role=%s", role)
+            return future.result()
+
+        try:
+            text = self._dispatch(prompt, role, system, response_schema)
+        except Exception as exc:
+            with self._lock:
+                self._inflight.pop(cache_key, None)
+            future.set_exception(exc)
+            raise
+
+        with self._lock:
+            # Store in cache before releasing the in-flight slot
+            if text:
+                self._cache[cache_key] = text
+                if len(self._cache) > self._cache_size:
+                    self._cache.popitem(last=False)
+            self._inflight.pop(cache_key, None)
+        future.set_result(text)
+        return text
 
-        # Multimodal → Gemini only (Groq has no image support)
-        is_multimodal = isinstance(prompt, list)
+    def generate_stream(
+        self,
+        prompt: str,
+        *,
+        role: str = "agent",
+        use_cache: bool = True,
+        system: str | None = None,
+    ) -> Iterator[str]:
+        """Yield a text response piece by piece as the backend produces it.
+
+        Same backend / fallback chain as :meth:`generate`.  Retries and model
+        fallback apply until the first piece arrives; an error after that
+        propagates to the caller.  A cache hit is yielded whole, and a
+        completed stream is cached for later ``generate`` / ``generate_stream``
+        calls with the same prompt.
+        """
+        cache_key = self._cache_key(prompt, role, system) if use_cache else None
+        if cache_key:
+            with self._lock:
+                cached = self._cache.get(cache_key)
+                if cached is not None:
+                    self._cache.move_to_end(cache_key)
+            if cached is not None:
+                logger.debug("Cache HIT for role=%s", role)
+                yield cached
+                return
+
+        parts: list[str] = []
+        for delta in self._dispatch(prompt, role, system, stream=True):
+            parts.append(delta)
+            yield delta
+
+        text = "".join(parts).rstrip()
+        if cache_key and text:
+            with self._lock:
+                self._cache[cache_key] = text
+                if len(self._cache) > self._cache_size:
+                    self._cache.popitem(last=False)
 
-        if is_multimodal:
-            text = self._generate_gemini(prompt, role)
-        elif self._backend == "groq" and self._groq_client:
+    def _dispatch(
+        self,
+        prompt: str | list[Any],
+        role: str,
+        system: str | None = None,
+        schema: dict[str, Any] | None = None,
+        stream: bool = False,
+    ) -> Any:
+        """Route *prompt* to the configured backend (with Groq → Gemini fallback).
+
+        Returns the response text, or an iterator of text pieces when
+        *stream* is set.
+        """
+        # Multimodal → Gemini only (Groq has no image support)
+        if isinstance(prompt, list):
+            return self._generate_gemini(prompt, role, system, schema, stream)
+        if self._backend == "groq" and self._groq_client:
             try:
-                text = self._generate_groq(prompt, role)
+                return self._generate_groq(prompt, role, system, schema, stream)
             except _BackendExhausted:
                 logger.warning("Groq exhausted — falling back to Gemini")
-                text = self._generate_gemini(prompt, role)
-        else:
-            text = self._generate_gemini(prompt, role)
-
-        # Store in cache
-        if cache_key and text:
-            self._cache[cache_key] = text
-            if len(self._cache) > self._cache_size:
-                self._cache.popitem(last=False)
-
-        return text
+        return self._generate_gemini(prompt, role, system, schema, stream)
 
     @property
     def model_map(self) -> dict[str, str]:
@@ -170,10 +499,17 @@ class LLMHelper:
         return dict(self._gemini_model_map)
 
     def cache_stats(self) -> dict[str, int]:
-        return {"cached_entries": len(self._cache), "max_size": self._cache_size}
+        bucket = gemini_bucket.stats()
+        return {
+            "cached_entries": len(self._cache),
+            "max_size": self._cache_size,
+            "gemini_calls": bucket["acquired"],
+            "gemini_retries": bucket["retries"],
+        }
 
     def clear_cache(self) -> None:
-        self._cache.clear()
+        with self._lock:
+            self._cache.clear()
 
     def reload_config(self) -> None:
         """Reload model maps and settings from Config (after admin changes)."""
@@ -188,77 +524,135 @@ class LLMHelper:
             "agent": Config.MODEL_AGENT,
             "synthesis": Config.MODEL_SYNTHESIS,
         }
-        self._groq_fallback = Config.GROQ_FALLBACK_CHAIN
-        self._gemini_fallback = Config.GEMINI_FALLBACK_CHAIN
         self._max_retries = Config.LLM_MAX_RETRIES
         self._base_delay = Config.LLM_RETRY_BASE_DELAY
+        self._timeouts: dict[str, float] = dict(Config.LLM_REQUEST_TIMEOUT)
         new_size = Config.LLM_CACHE_SIZE
         if new_size != self._cache_size:
             self._cache_size = new_size
             self._cache.clear()
-        self._blocked_models.clear()
-        self._gemini_models.clear()
+        self._build_model_state()
         logger.info(
             "LLMHelper reloaded  (backend=%s  agent=%s)",
             self._backend,
             self._groq_model_map["agent"] if self._backend == "groq" else self._gemini_model_map["agent"],
         )
 
-    # ── Groq backend ───────────────────────────────────────────────────
+    # ── shared retry / fallback loop ───────────────────────────────────
 
-    def _generate_groq(self, prompt: str, role: str) -> str:
+    def _generate_groq(
+        self,
+        prompt: str,
+        role: str,
+        system: str | None = None,
+        schema: dict[str, Any] | None = None,
+        stream: bool = False,
+    ) -> Any:
         """Try each Groq model in the fallback chain."""
-        chain = self._groq_fallback.get(
-            role, [self._groq_model_map.get(role, "llama-3.3-70b-versatile")]
-        )
+        return self._run_with_retries(self._groq, prompt, role, system, schema, stream)
+
+    def _generate_gemini(
+        self,
+        prompt: str | list[Any],
+        role: str,
+        system: str | None = None,
+        schema: dict[str, Any] | None = None,
+        stream: bool = False,
+    ) -> Any:
+        """Try each Gemini model in the fallback chain."""
+        if not _gemini_available or not Config.GEMINI_API_KEY:
+            raise RuntimeError("Gemini backend not available (missing API key or package)")
+        try:
+            return self._run_with_retries(self._gemini, prompt, role, system, schema, stream)
+        except _BackendExhausted as exc:
+            if exc.__cause__ is not None:
+                raise exc.__cause__
+            raise RuntimeError(
+                f"All models exhausted for role={role}. "
+                "Both Groq and Gemini quotas are used up. "
+                "Wait for daily reset or add a new API key."
+            ) from None
+
+    def _run_with_retries(
+        self,
+        backend: _Backend,
+        prompt: str | list[Any],
+        role: str,
+        system: str | None = None,
+        schema: dict[str, Any] | None = None,
+        stream: bool = False,
+    ) -> Any:
+        """Walk *backend*'s fallback chain for *role*, retrying each model.
+
+        Raises ``_BackendExhausted`` (chained to the last error) when every
+        model is blocked or failed.
+        """
         last_error: Exception | None = None
 
-        for model_name in chain:
-            key = f"groq:{model_name}"
-            if key in self._blocked_models:
+        for state in self._chain_for(backend.name, role, backend.default_model):
+            if state.blocked_until > time.monotonic():
                 continue
 
             try:
-                return self._call_groq(model_name, prompt, role)
+                return self._call_with_retries(
+                    backend, state, prompt, role, system, schema, stream
+                )
             except _HardBlock:
-                self._blocked_models.add(key)
-                logger.warning("Groq %s hard-blocked — trying next", model_name)
+                state.blocked_until = math.inf
+                logger.warning("%s %s hard-blocked — trying next", backend.label, state.name)
                 continue
             except Exception as exc:
                 last_error = exc
-                logger.warning(
-                    "Groq %s failed (role=%s): %s — trying next",
-                    model_name, role, str(exc)[:120],
-                )
+                if logger.isEnabledFor(logging.WARNING):
+                    # %.120s truncates inside the formatter, only when emitted
+                    logger.warning(
+                        "%s %s failed (role=%s): %.120s — trying next",
+                        backend.label, state.name, role, exc,
+                    )
                 continue
 
-        raise _BackendExhausted(f"All Groq models exhausted for role={role}") from last_error
+        raise _BackendExhausted(
+            f"All {backend.label} models exhausted for role={role}"
+        ) from last_error
 
-    def _call_groq(self, model_name: str, prompt: str, role: str) -> str:
-        """Call Groq chat completion with retry on transient errors."""
+    def _call_with_retries(
+        self,
+        backend: _Backend,
+        state: _ModelState,
+        prompt: str | list[Any],
+        role: str,
+        system: str | None = None,
+        schema: dict[str, Any] | None = None,
+        stream: bool = False,
+    ) -> Any:
+        """Call one model with retry on transient errors.
+
+        Timeouts are not retried on the same model — they propagate so the
+        chain moves on to the next model.
+        """
+        timeout = self._timeouts.get(role, _DEFAULT_TIMEOUT)
+        call = backend.stream if stream else backend.call
         for attempt in range(1, self._max_retries + 1):
             try:
-                response = self._groq_client.chat.completions.create(
-                    model=model_name,
-                    messages=[{"role": "user", "content": prompt}],
-                    temperature=0.3,
-                    max_tokens=2048,
-                )
-                return response.choices[0].message.content.strip()
+                return call(state, prompt, timeout, system, schema)
             except Exception as exc:
+                if _is_timeout(exc):
+                    raise
                 err = str(exc)
 
                 if "limit: 0" in err or "limit:0" in err:
-                    raise _HardBlock(f"groq:{model_name} hard-blocked") from exc
+                    raise _HardBlock(f"{backend.name}:{state.name} hard-blocked") from exc
 
-                is_rate_limit = "429" in err or "rate_limit" in err.lower()
+                is_rate_limit = backend.is_rate_limit(err)
                 is_server_error = "500" in err or "503" in err
 
                 if (is_rate_limit or is_server_error) and attempt < self._max_retries:
                     delay = self._base_delay * (2 ** (attempt - 1))
+                    if backend.name == "gemini":
+                        gemini_bucket.record_retry()
                     logger.warning(
-                        "Groq %s (role=%s) — %s — retry %ds (%d/%d)",
-                        model_name, role,
+                        "%s %s (role=%s) — %s — retry %ds (%d/%d)",
+                        backend.label, state.name, role,
                         "rate-limited" if is_rate_limit else "server error",
                         delay, attempt, self._max_retries,
                     )
@@ -267,91 +661,94 @@ class LLMHelper:
                     raise
         return ""
 
-    # ── Gemini backend ─────────────────────────────────────────────────
+    # ── model state ────────────────────────────────────────────────────
 
-    def _generate_gemini(self, prompt: str | list[Any], role: str) -> str:
-        """Try each Gemini model in the fallback chain."""
-        if not _gemini_available or not Config.GEMINI_API_KEY:
-            raise RuntimeError("Gemini backend not available (missing API key or package)")
+    def _build_model_state(self) -> None:
+        """(Re)build ``_models`` and ``_chain`` from Config.
 
-        chain = self._gemini_fallback.get(
-            role, [self._gemini_model_map.get(role, "gemini-2.0-flash")]
+        Called from ``__init__`` and ``reload_config`` — clears blocks and
+        pre-builds a ``GenerativeModel`` for every Gemini model the chains
+        can hit, so the first request on a cold path doesn't pay for it.
+        """
+        self._models = {}
+        self._chain = {}
+        chains = (
+            ("groq", Config.GROQ_FALLBACK_CHAIN, self._groq_model_map),
+            ("gemini", Config.GEMINI_FALLBACK_CHAIN, self._gemini_model_map),
         )
-        last_error: Exception | None = None
-
-        for model_name in chain:
-            key = f"gemini:{model_name}"
-            if key in self._blocked_models:
-                continue
-
-            model = self._get_gemini_model(model_name)
-            try:
-                return self._call_gemini(model, prompt, role)
-            except _HardBlock:
-                self._blocked_models.add(key)
-                logger.warning("Gemini %s hard-blocked — trying next", model_name)
-                continue
-            except Exception as exc:
-                last_error = exc
-                logger.warning(
-                    "Gemini %s failed (role=%s): %s — trying next",
-                    model_name, role, str(exc)[:120],
+        for backend, fallback, model_map in chains:
+            for role, names in fallback.items():
+                self._chain[(backend, role)] = [self._register(backend, n) for n in names]
+            for name in model_map.values():
+                self._register(backend, name)
+
+    def _register(self, backend: str, name: str) -> str:
+        """Ensure a ``_ModelState`` exists for *name*; return its key."""
+        name = sys.intern(name)
+        key = sys.intern(f"{backend}:{name}")
+        if key not in self._models:
+            gemini_obj = None
+            if backend == "gemini" and _gemini_available and Config.GEMINI_API_KEY:
+                gemini_obj = genai.GenerativeModel(
+                    name, generation_config=_GEMINI_GENERATION_CONFIG
                 )
-                continue
-
-        if last_error:
-            raise last_error
-        raise RuntimeError(
-            f"All models exhausted for role={role}. "
-            "Both Groq and Gemini quotas are used up. "
-            "Wait for daily reset or add a new API key."
-        )
-
-    def _get_gemini_model(self, model_name: str) -> Any:
-        if model_name not in self._gemini_models:
-            self._gemini_models[model_name] = genai.GenerativeModel(model_name)
-        return self._gemini_models[model_name]
-
-    def _call_gemini(self, model: Any, prompt: str | list[Any], role: str) -> str:
-        """Call Gemini generate_content with retry."""
-        for attempt in range(1, self._max_retries + 1):
-            try:
-                response = model.generate_content(prompt)
-                return response.text.strip()
-            except Exception as exc:
-                err = str(exc)
+            self._models[key] = _ModelState(name=name, backend=backend, gemini_obj=gemini_obj)
+        return key
 
-                if "limit: 0" in err or "limit:0" in err:
-                    raise _HardBlock(f"{model.model_name} hard-blocked") from exc
-
-                is_rate_limit = "429" in err or "ResourceExhausted" in err
-                is_server_error = "500" in err or "503" in err
-
-                if (is_rate_limit or is_server_error) and attempt < self._max_retries:
-                    delay = self._base_delay * (2 ** (attempt - 1))
-                    logger.warning(
-                        "Gemini %s (role=%s) — %s — retry %ds (%d/%d)",
-                        model.model_name, role,
-                        "rate-limited" if is_rate_limit else "server error",
-                        delay, attempt, self._max_retries,
-                    )
-                    time.sleep(delay)
-                else:
-                    raise
-        return ""
+    def _chain_for(self, backend: str, role: str, default: str) -> list[_ModelState]:
+        """Ordered model states to try for *role* on *backend*."""
+        keys = self._chain.get((backend, role))
+        if keys is None:
+            model_map = self._groq_model_map if backend == "groq" else self._gemini_model_map
+            keys = [self._register(backend, model_map.get(role, default))]
+        return [self._models[k] for k in keys]
 
     # ── shared helpers ─────────────────────────────────────────────────
 
     @staticmethod
-    def _cache_key(prompt: str | list[Any], role: str) -> str:
+    def _cache_key(
+        prompt: str | list[Any],
+        role: str,
+        system: str | None = None,
+        schema: dict[str, Any] | None = None,
+    ) -> str:
         if isinstance(prompt, str):
             raw = f"{role}::{prompt}"
         else:
             text_parts = [str(p) for p in prompt if isinstance(p, str)]
             raw = f"{role}::{'||'.join(text_parts)}"
+        if system:
+            raw = f"{system}##{raw}"
+        if schema:
+            raw = f"{json.dumps(schema, sort_keys=True)}##{raw}"
         return hashlib.sha256(raw.encode()).hexdigest()
 
 
-# ── Module-level singleton ─────────────────────────────────────────────
+# ── Module-level singleton (lazy) ──────────────────────────────────────
 # Import and use:  from backend.services.llm_helper import llm
-llm = LLMHelper()
+# The helper is only built on first access, so importing this module does
+# not create API clients for scripts that never generate anything.
+
+_instance: LLMHelper | None = None
+_instance_lock = threading.Lock()
+
+
+def get_llm() -> LLMHelper:
+    """Return the shared ``LLMHelper``, creating it on first call.
+
+    Thread-safe: background memory extraction can make the first call
+    from a pool worker while the script thread does the same.
+    """
+    global _instance
+    if _instance is None:
+        with _instance_lock:
+            if _instance is None:
+                _instance = LLMHelper()
+    return _instance
+
+
+def __getattr__(name: str) -> Any:
+    # PEP 562: keeps ``from backend.services.llm_helper import llm`` working
+    if name == "llm":
+        return get_llm()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
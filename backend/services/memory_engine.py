@@ -4,7 +4,8 @@ Architecture inspired by mem0 (https://github.com/mem0ai/mem0):
   - **Fact Extraction**: LLM extracts structured facts from every conversation turn
   - **Categories**: personal, farming, crops, location, equipment, preferences, experiences
   - **Deduplication**: new facts are compared against existing; duplicates merged, conflicts resolved
-  - **Semantic Search**: memories retrieved by embedding cosine similarity (Gemini embeddings)
+  - **Semantic Search**: memories retrieved by embedding cosine similarity (pgvector RPC,
+    Python scoring as fallback)
   - **Memory Injection**: relevant memories injected into every LLM prompt for personalisation
   - **Importance Scoring**: memories scored 1-10; decayed over time, boosted on access
   - **Short-term + Long-term**: conversation buffer (session) + persistent store (Supabase)
@@ -16,6 +17,7 @@ Usage::
 
     mem = MemoryEngine(user_id="uuid-here")
     mem.add_from_conversation(user_msg, assistant_msg)      # extract & store facts
+    mem.add_from_conversation_async(user_msg, assistant_msg)  # same, off the page thread
     context = mem.get_memory_context(query)                 # retrieve relevant memories
     all_memories = mem.get_all()                             # list everything
     mem.delete(memory_id)                                    # remove one
@@ -24,13 +26,25 @@ Usage::
 
 from __future__ import annotations
 
+import heapq
 import json
 import logging
+import threading
 import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
 from datetime import datetime, timezone
+from operator import itemgetter
 from typing import TYPE_CHECKING, Any
 
+import numpy as np
+import orjson
+from cachetools import LRUCache, TTLCache
+
 from backend.config import Config
+from backend.services.rate_limit import call_with_backoff, gemini_bucket
+from backend.services.supabase_service import is_missing_rpc
 
 if TYPE_CHECKING:
     from supabase import Client
@@ -70,9 +84,12 @@ MEMORY_CATEGORIES = [
     "financial",      # budget, loans, insurance, subsidy status
 ]
 
-EXTRACTION_PROMPT = """You are a memory extraction system for KrishiSaathi, an AI farming advisor.
+# Prompts are split into a static system part (identical on every call, so
+# the provider can cache it) and a short per-turn template.  Nothing
+# user-specific may go into the *_SYSTEM strings.
+EXTRACTION_SYSTEM = """You are a memory extraction system for KrishiSaathi, an AI farming advisor.
 
-Analyse the following conversation between a farmer and the AI assistant.
+Analyse the conversation between a farmer and the AI assistant given by the user.
 Extract ALL factual information about the farmer that should be remembered for future conversations.
 
 RULES:
@@ -88,15 +105,15 @@ Format:
 [
   {{"fact": "The farmer grows cotton in 5 acres", "category": "crops", "importance": 8}},
   {{"fact": "The farmer is from Karimnagar district", "category": "location", "importance": 9}}
-]
+]""".format(categories=", ".join(MEMORY_CATEGORIES))
 
-CONVERSATION:
+EXTRACTION_TEMPLATE = """CONVERSATION:
 Farmer: {user_message}
 Assistant: {assistant_message}
 
 Extract facts (JSON array only, no explanation):"""
 
-DEDUP_PROMPT = """You are a memory deduplication system.
+DEDUP_SYSTEM = """You are a memory deduplication system.
 
 Compare NEW_FACT against EXISTING_MEMORIES.
 Determine if the new fact:
@@ -105,18 +122,71 @@ Determine if the new fact:
 - "update": updates/corrects/expands an existing memory (return the ID to update)
 
 Return JSON:
-{{"action": "new"|"duplicate"|"update", "update_id": null|"memory_id", "merged_fact": null|"updated text"}}
+{"action": "new"|"duplicate"|"update", "update_id": null|"memory_id", "merged_fact": null|"updated text"}"""
 
-EXISTING_MEMORIES:
+DEDUP_TEMPLATE = """EXISTING_MEMORIES:
 {existing}
 
 NEW_FACT: {new_fact}
 
 Decision (JSON only):"""
 
+# Response schemas for JSON mode (OpenAPI subset accepted by Gemini)
+FACTS_SCHEMA: dict[str, Any] = {
+    "type": "ARRAY",
+    "items": {
+        "type": "OBJECT",
+        "properties": {
+            "fact": {"type": "STRING"},
+            "category": {"type": "STRING", "format": "enum", "enum": MEMORY_CATEGORIES},
+            "importance": {"type": "INTEGER"},
+        },
+        "required": ["fact", "category", "importance"],
+    },
+}
+
+DEDUP_SCHEMA: dict[str, Any] = {
+    "type": "OBJECT",
+    "properties": {
+        "action": {"type": "STRING", "format": "enum", "enum": ["new", "duplicate", "update"]},
+        "update_id": {"type": "STRING", "nullable": True},
+        "merged_fact": {"type": "STRING", "nullable": True},
+    },
+    "required": ["action"],
+}
+
 SHORT_TERM_LIMIT = 20   # max conversation turns kept in short-term buffer
 MAX_MEMORY_INJECT = 12  # max memories injected into prompt
 MEMORY_DECAY_DAYS = 90  # memories lose importance after this many days
+EMBEDDING_DIM = 768     # matches the ``halfvec(768)`` column (docs/SUPABASE_SETUP.md §4b)
+EMBED_SCALE = 127       # int8 quantisation scale for cached unit-norm embeddings
+EMBED_MAX_CHARS = 2000  # text is truncated to this before embedding
+EMBED_QUERY_TIMEOUT = 5.0  # seconds; query embeds run before every reply
+EMBED_BACKFILL_BATCH = 100  # NULL-embedding rows re-embedded per pass (Gemini batch max)
+
+# Process-wide embedding cache keyed by (model, truncated text).  Safe only
+# because every call pins task_type="SEMANTIC_SIMILARITY" and EMBEDDING_DIM.
+_EMBED_CACHE: TTLCache = TTLCache(maxsize=4096, ttl=3600)
+_EMBED_CACHE_LOCK = threading.Lock()
+
+# Background fact extraction, so a chat turn doesn't wait on it
+_extract_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="memory")
+
+
+@dataclass(frozen=True, slots=True)
+class _EmbeddingIndex:
+    """Local-search cache (SoA): row i of every column is ``ids[i]``.
+
+    Built in one go and swapped in with a single assignment, so a reader
+    holding a reference never sees columns from two different loads.
+    """
+
+    matrix: np.ndarray       # (N, EMBEDDING_DIM) int8, see ``_quantize``
+    ids: list[int]
+    rows: list[dict]
+    importance: np.ndarray   # float32
+    access: np.ndarray       # float32; bumped in place by ``_boost_memories``
+    created: np.ndarray      # float64 Unix times
 
 
 # ═══════════════════════════════════════════════════════════════════════
@@ -126,11 +196,18 @@ MEMORY_DECAY_DAYS = 90  # memories lose importance after this many days
 class MemoryEngine:
     """Per-user memory store — short-term (session) + long-term (Supabase)."""
 
+    # Dedup bands on cosine similarity: ≥ HIGH is a duplicate, < LOW is new,
+    # and only the band in between is sent to the LLM to decide.
+    DEDUP_HIGH = 0.88
+    DEDUP_LOW = 0.80
+
     def __init__(self, user_id: str) -> None:
         self.user_id = user_id
 
         # Short-term conversation buffer (this session only)
-        self._short_term: list[dict] = []
+        self._short_term: deque[dict] = deque(maxlen=SHORT_TERM_LIMIT * 2)
+        # Serialises background extractions for this user
+        self._write_lock = threading.Lock()
 
         # Embedding model
         self._embed_model = Config.EMBEDDING_MODEL
@@ -138,6 +215,20 @@ class MemoryEngine:
         # Supabase client (lazy, with auth tokens)
         self._client: Client | None = None
 
+        # Cleared if the SQL functions from docs/SUPABASE_SETUP.md §4b are missing
+        self._has_match_rpc = True
+        self._has_boost_rpc = True
+        self._has_dedup_rpc = True
+        self._has_context_rpc = True
+        # Set once none of this user's memories lacks an EMBEDDING_DIM vector
+        self._backfilled = False
+
+        # Local-search cache, built lazily and dropped on writes.  Background
+        # writes bump _emb_gen so a load that raced one isn't stored.
+        self._emb_index: _EmbeddingIndex | None = None
+        self._emb_gen = 0
+        self._emb_lock = threading.Lock()
+
     # ── Supabase client ────────────────────────────────────────────────
 
     def _get_client(self) -> "Client | None":
@@ -172,36 +263,39 @@ class MemoryEngine:
         Returns the list of newly stored memories.
         """
         # 1. Add to short-term buffer
-        self._short_term.append({
-            "role": "user", "content": user_message,
-            "ts": datetime.now(timezone.utc).isoformat(),
-        })
-        self._short_term.append({
-            "role": "assistant", "content": assistant_message,
-            "ts": datetime.now(timezone.utc).isoformat(),
-        })
-        if len(self._short_term) > SHORT_TERM_LIMIT * 2:
-            self._short_term = self._short_term[-(SHORT_TERM_LIMIT * 2):]
+        ts = datetime.now(timezone.utc).isoformat()
+        self._short_term.append({"role": "user", "content": user_message, "ts": ts})
+        self._short_term.append({"role": "assistant", "content": assistant_message, "ts": ts})
 
         # 2. Extract facts via LLM
         facts = self._extract_facts(user_message, assistant_message)
         if not facts:
             return []
 
-        # 3. Deduplicate against existing memories
+        # 3. Embed every fact in one call (reused for dedup and storage)
+        facts = [f for f in facts if f.get("fact")]
+        embeddings = self._embed_batch([f["fact"] for f in facts])
+
+        # 4. Deduplicate against existing memories — nearest neighbours come
+        #    from the dedup_candidates RPC; only without it are all memories
+        #    loaded and compared locally.
+        remotes = [self._dedup_candidates_rpc(e) for e in embeddings]
+        if any(r is None for r in remotes):
+            existing, ex_mat = self._load_existing_memories()
+            remotes = [[] for _ in remotes]
+        else:
+            existing, ex_mat = [], np.zeros((0, EMBEDDING_DIM), dtype=np.float32)
+        decisions = self._deduplicate_batch(
+            [f["fact"] for f in facts], embeddings, existing, ex_mat, remotes
+        )
+
         stored: list[dict] = []
-        existing = self._load_existing_memories()
+        pending: list[dict] = []
 
-        for fact_obj in facts:
-            fact_text = fact_obj.get("fact", "")
+        for fact_obj, embedding, action_info in zip(facts, embeddings, decisions):
+            fact_text = fact_obj["fact"]
             category = fact_obj.get("category", "personal")
             importance = min(max(int(fact_obj.get("importance", 5)), 1), 10)
-
-            if not fact_text:
-                continue
-
-            # Dedup check
-            action_info = self._deduplicate(fact_text, existing)
             action = action_info.get("action", "new")
 
             if action == "duplicate":
@@ -219,15 +313,43 @@ class MemoryEngine:
                     stored.append({"fact": merged, "category": category, "action": "updated"})
                 continue
 
-            # New memory
-            embedding = self._embed(fact_text)
-            mem = self._store_memory(fact_text, category, importance, embedding)
-            if mem:
-                stored.append({**mem, "action": "created"})
-                existing.append(mem)  # so next fact in this batch can dedup against it
+            # New memory — inserted together after the loop
+            pending.append(self._build_row(fact_text, category, importance, embedding))
+
+        # 5. Store all new memories in one request
+        for mem in self._flush_rows(pending):
+            stored.append({**mem, "action": "created"})
 
         return stored
 
+    def add_from_conversation_async(
+        self,
+        user_message: str,
+        assistant_message: str,
+    ) -> Future:
+        """Run :meth:`add_from_conversation` on a background thread.
+
+        The Supabase client is resolved here first, since building it reads
+        the caller's Streamlit session.  Failures are logged, not raised;
+        the future resolves to the stored memories (``[]`` on error).
+        """
+        self._get_client()
+        return _extract_pool.submit(self._add_in_background, user_message, assistant_message)
+
+    def _add_in_background(self, user_message: str, assistant_message: str) -> list[dict]:
+        try:
+            with self._write_lock:
+                stored = self.add_from_conversation(user_message, assistant_message)
+        except Exception as exc:
+            logger.warning("Memory extraction failed (non-fatal): %s", exc)
+            return []
+        if not self._backfilled:
+            with self._write_lock:
+                self._backfill_embeddings()
+        if stored:
+            logger.info("Stored %d new memories from this turn", len(stored))
+        return stored
+
     # ═══════════════════════════════════════════════════════════════════
     #  Retrieval: Semantic search + scoring
     # ═══════════════════════════════════════════════════════════════════
@@ -245,19 +367,19 @@ class MemoryEngine:
         parts: list[str] = []
 
         # ── Long-term memories (semantic search) ───────────────────────
-        relevant = self.search(query, top_k=max_memories)
-        if relevant:
-            mem_lines = []
-            for m in relevant:
-                cat = m.get("category", "")
-                fact = m.get("content", "")
-                score = m.get("_score", 0)
-                mem_lines.append(f"  - [{cat}] {fact}")
-            parts.append("Known facts about this farmer:\n" + "\n".join(mem_lines))
+        query_embedding = self._embed(query)
+        mem_block = self._memory_context_rpc(query_embedding, max_memories)
+        if mem_block is None:
+            relevant = self._search(query, max_memories, query_embedding)
+            mem_block = "\n".join(
+                f"  - [{m.get('category', '')}] {m.get('content', '')}" for m in relevant
+            )
+        if mem_block:
+            parts.append("Known facts about this farmer:\n" + mem_block)
 
         # ── Short-term conversation context ────────────────────────────
         if self._short_term:
-            recent = self._short_term[-6:]  # last 3 turns
+            recent = list(self._short_term)[-6:]  # last 3 turns
             conv_lines = []
             for msg in recent:
                 role = "Farmer" if msg["role"] == "user" else "KrishiSaathi"
@@ -278,66 +400,27 @@ class MemoryEngine:
 
         Returns memories sorted by relevance score (descending).
         """
+        return self._search(query, top_k, self._embed(query))
+
+    def _search(
+        self, query: str, top_k: int, query_embedding: list[float] | None
+    ) -> list[dict]:
+        """``search`` with the query already embedded (keyword search when
+        the embedding failed)."""
         client = self._get_client()
         if not client:
             return []
 
-        query_embedding = self._embed(query)
         if not query_embedding:
             return self._keyword_search(query, top_k)
 
         try:
-            # Fetch all user memories with embeddings for similarity calc
-            res = (
-                client.table("memories")
-                .select("id, content, category, importance, access_count, embedding, created_at, updated_at")
-                .eq("user_id", self.user_id)
-                .execute()
-            )
-            if not res.data:
-                return []
-
-            # Compute cosine similarity + importance scoring
-            scored: list[tuple[float, dict]] = []
-            now = datetime.now(timezone.utc)
-
-            for row in res.data:
-                row_emb = row.get("embedding")
-                if not row_emb:
-                    continue
-                if isinstance(row_emb, str):
-                    row_emb = json.loads(row_emb)
-
-                sim = self._cosine_similarity(query_embedding, row_emb)
-
-                # Time decay: reduce score for old memories
-                created = datetime.fromisoformat(row["created_at"].replace("Z", "+00:00"))
-                days_old = (now - created).days
-                decay = max(0.3, 1.0 - (days_old / MEMORY_DECAY_DAYS) * 0.5)
-
-                # Composite score: similarity (60%) + importance (25%) + recency (15%)
-                importance_norm = row.get("importance", 5) / 10.0
-                access_boost = min(row.get("access_count", 0) / 20.0, 0.2)  # cap at 0.2
-                score = (sim * 0.6) + (importance_norm * 0.25) + (decay * 0.15) + access_boost
-
-                mem = {
-                    "id": row["id"],
-                    "content": row["content"],
-                    "category": row.get("category", ""),
-                    "importance": row.get("importance", 5),
-                    "access_count": row.get("access_count", 0),
-                    "created_at": row.get("created_at"),
-                    "_score": round(score, 4),
-                    "_similarity": round(sim, 4),
-                }
-                scored.append((score, mem))
-
-            scored.sort(key=lambda x: x[0], reverse=True)
-            results = [m for _, m in scored[:top_k]]
+            results = self._match_memories_rpc(client, query_embedding, top_k)
+            if results is None:
+                results = self._search_local(client, query_embedding, top_k)
 
             # Boost access count for retrieved memories
-            for m in results[:5]:
-                self._boost_memory(m["id"])
+            self._boost_memories([m["id"] for m in results[:5]])
 
             return results
 
@@ -345,6 +428,177 @@ class MemoryEngine:
             logger.warning("Memory search failed: %s", exc)
             return []
 
+    def _memory_context_rpc(
+        self, query_embedding: list[float] | None, top_k: int
+    ) -> str | None:
+        """Formatted memory lines from the ``memory_context`` RPC.
+
+        Ranking, formatting and the access boost all happen in Postgres in
+        one round-trip.  Returns ``None`` (caller falls back to ``search``)
+        when the function is missing or the query can't be embedded.
+        """
+        if not self._has_context_rpc:
+            return None
+        if not query_embedding:
+            return None
+        client = self._get_client()
+        if not client:
+            return None
+        try:
+            res = client.rpc("memory_context", {
+                "p_user": self.user_id,
+                "p_query": query_embedding,
+                "p_k": top_k,
+                "p_decay_days": MEMORY_DECAY_DAYS,
+            }).execute()
+        except Exception as exc:
+            self._rpc_failed("memory_context", "_has_context_rpc", exc)
+            return None
+        return res.data or ""
+
+    def _match_memories_rpc(
+        self, client: "Client", query_embedding: list[float], top_k: int
+    ) -> list[dict] | None:
+        """Similarity + scoring in Postgres via the ``match_memories`` RPC.
+
+        Returns ``None`` when the function isn't installed so the caller
+        can fall back to scoring in Python.
+        """
+        if not self._has_match_rpc:
+            return None
+        try:
+            res = client.rpc("match_memories", {
+                "p_user": self.user_id,
+                "p_query": query_embedding,
+                "p_k": top_k,
+                "p_decay_days": MEMORY_DECAY_DAYS,
+            }).execute()
+        except Exception as exc:
+            self._rpc_failed("match_memories", "_has_match_rpc", exc)
+            return None
+        return [
+            {
+                "id": row["id"],
+                "content": row["content"],
+                "category": row.get("category", ""),
+                "importance": row.get("importance", 5),
+                "access_count": row.get("access_count", 0),
+                "created_at": row.get("created_at"),
+                "_score": round(row.get("score") or 0.0, 4),
+                "_similarity": round(row.get("similarity") or 0.0, 4),
+            }
+            for row in res.data or []
+        ]
+
+    def _search_local(
+        self, client: "Client", query_embedding: list[float], top_k: int
+    ) -> list[dict]:
+        """Fallback: score every memory in Python (NumPy) when the RPC is absent.
+
+        Embeddings are held as one L2-normalised ``(N, D)`` int8 matrix
+        (see ``_quantize``), so all similarities are a single integer
+        matrix-vector product.
+        """
+        index = self._embedding_index(client)
+        if not index.rows:
+            return []
+
+        q = np.asarray(query_embedding, dtype=np.float32)
+        q_norm = np.linalg.norm(q)
+        if q.shape[0] != index.matrix.shape[1] or q_norm == 0:
+            sims = np.zeros(len(index.rows), dtype=np.float32)
+        else:
+            q_int = self._quantize(q / q_norm).astype(np.int32)
+            sims = (index.matrix @ q_int).astype(np.float32) * (1.0 / EMBED_SCALE**2)
+
+        # Time decay: reduce score for old memories
+        days_old = np.floor((time.time() - index.created) / 86400.0)
+        decay = np.maximum(0.3, 1.0 - (days_old / MEMORY_DECAY_DAYS) * 0.5)
+
+        # Composite score: similarity (60%) + importance (25%) + recency (15%)
+        access_boost = np.minimum(index.access / 20.0, 0.2)  # cap at 0.2
+        scores = (sims * 0.6) + (index.importance / 10.0 * 0.25) + (decay * 0.15) + access_boost
+
+        k = min(top_k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+
+        return [
+            {
+                **index.rows[i],
+                "access_count": int(index.access[i]),
+                "_score": round(float(scores[i]), 4),
+                "_similarity": round(float(sims[i]), 4),
+            }
+            for i in top
+        ]
+
+    def _embedding_index(self, client: "Client") -> _EmbeddingIndex:
+        """The local-search cache, loading it first if a write dropped it.
+
+        Callers keep the returned snapshot in a local: a background write
+        may drop ``_emb_index`` at any time, but never mutates a snapshot.
+        """
+        index = self._emb_index
+        if index is not None:
+            return index
+        gen = self._emb_gen
+        index = self._load_embedding_matrix(client)
+        with self._emb_lock:
+            if self._emb_gen == gen:
+                self._emb_index = index
+        return index
+
+    def _load_embedding_matrix(self, client: "Client") -> _EmbeddingIndex:
+        """Fetch all memories and lay them out column-wise (SoA).
+
+        Rows whose embedding has a different size than ``EMBEDDING_DIM``
+        get a zero vector — similarity 0, but still ranked on importance
+        and recency like before.
+        """
+        res = (
+            client.table("memories")
+            .select("id, content, category, importance, access_count, embedding, created_at")
+            .eq("user_id", self.user_id)
+            .execute()
+        )
+        rows: list[dict] = []
+        vectors: list[Any] = []
+        for row in res.data or []:
+            row_emb = row.pop("embedding", None)
+            if not row_emb:
+                continue
+            vectors.append(row_emb)
+            rows.append({
+                "id": row["id"],
+                "content": row["content"],
+                "category": row.get("category", ""),
+                "importance": row.get("importance", 5),
+                "created_at": row.get("created_at"),
+                "_access_count": row.get("access_count", 0),
+            })
+
+        return _EmbeddingIndex(
+            matrix=self._quantize(self._stack_embeddings(vectors)),
+            ids=[r["id"] for r in rows],
+            importance=np.array([r["importance"] for r in rows], dtype=np.float32),
+            access=np.array([r.pop("_access_count") for r in rows], dtype=np.float32),
+            created=np.array([self._epoch(r["created_at"]) for r in rows], dtype=np.float64),
+            rows=rows,
+        )
+
+    def close(self) -> None:
+        """Release cached state (embedding matrix, client, session buffer)."""
+        self._invalidate_embeddings()
+        self._short_term.clear()
+        self._client = None
+
+    def _invalidate_embeddings(self) -> None:
+        """Drop the cached embedding matrix after any write."""
+        with self._emb_lock:
+            self._emb_gen += 1
+            self._emb_index = None
+
     def get_all(self, limit: int = 100) -> list[dict]:
         """Return all memories for this user (newest first)."""
         client = self._get_client()
@@ -390,6 +644,7 @@ class MemoryEngine:
             return False
         try:
             client.table("memories").delete().eq("id", memory_id).eq("user_id", self.user_id).execute()
+            self._invalidate_embeddings()
             return True
         except Exception as exc:
             logger.warning("delete memory failed: %s", exc)
@@ -403,6 +658,7 @@ class MemoryEngine:
         try:
             client.table("memories").delete().eq("user_id", self.user_id).execute()
             self._short_term.clear()
+            self._invalidate_embeddings()
             return True
         except Exception as exc:
             logger.warning("clear_all memories failed: %s", exc)
@@ -437,14 +693,16 @@ class MemoryEngine:
         """Use LLM to extract factual memories from a conversation turn."""
         from backend.services.llm_helper import llm
 
-        prompt = EXTRACTION_PROMPT.format(
-            categories=", ".join(MEMORY_CATEGORIES),
+        prompt = EXTRACTION_TEMPLATE.format(
             user_message=user_msg[:1500],
             assistant_message=assistant_msg[:1500],
         )
 
         try:
-            raw = llm.generate(prompt, role="classifier", use_cache=False)
+            raw = llm.generate(
+                prompt, role="classifier", use_cache=False,
+                system=EXTRACTION_SYSTEM, response_schema=FACTS_SCHEMA,
+            )
             parsed = self._safe_json_array(raw)
             if parsed:
                 logger.info("Extracted %d facts from conversation", len(parsed))
@@ -453,84 +711,154 @@ class MemoryEngine:
             logger.warning("Fact extraction failed: %s", exc)
             return []
 
-    def _deduplicate(self, new_fact: str, existing: list[dict]) -> dict:
-        """Check if a fact is new, duplicate, or an update of existing."""
-        if not existing:
-            return {"action": "new"}
-
-        # Quick embedding-based pre-filter: if very similar to any existing → candidate
-        new_emb = self._embed(new_fact)
-        candidates: list[dict] = []
-
-        for mem in existing:
-            mem_emb = mem.get("embedding")
-            if mem_emb and new_emb:
-                if isinstance(mem_emb, str):
-                    mem_emb = json.loads(mem_emb)
-                sim = self._cosine_similarity(new_emb, mem_emb)
-                if sim > 0.75:  # high similarity threshold
-                    candidates.append({**mem, "_sim": sim})
+    def _deduplicate_batch(
+        self,
+        new_facts: list[str],
+        new_embs: list[list[float] | None],
+        existing: list[dict],
+        ex_mat: np.ndarray,
+        remotes: list[list[dict]],
+    ) -> list[dict]:
+        """Decide new / duplicate / update for every fact of a turn.
 
+        *ex_mat* holds the normalised embeddings of *existing* row for row
+        (see ``_stack_embeddings``); *remotes* are each fact's candidates
+        already scored by the ``dedup_candidates`` RPC.  All similarities
+        come from two matrix products (facts × existing, facts × facts);
+        facts judged new are also candidates for the facts after them.
+        """
+        new_mat = self._stack_embeddings(new_embs)
+        ex_sims = new_mat @ ex_mat.T    # (k, N)
+        own_sims = new_mat @ new_mat.T  # (k, k)
+        low = self.DEDUP_LOW  # below this it's simply new
+
+        decisions: list[dict] = []
+        queued: list[int] = []  # facts decided "new" so far (no id yet)
+        for i, new_fact in enumerate(new_facts):
+            if not new_embs[i]:
+                decision: dict = {"action": "new"}
+            else:
+                candidates = [
+                    {**row, "_sim": row["sim"]} for row in remotes[i] if row["sim"] >= low
+                ]
+                candidates.extend(
+                    {**existing[j], "_sim": float(ex_sims[i, j])}
+                    for j in np.flatnonzero(ex_sims[i] >= low)
+                )
+                candidates.extend(
+                    {"id": None, "content": new_facts[j], "_sim": float(own_sims[i, j])}
+                    for j in queued
+                    if own_sims[i, j] >= low
+                )
+                decision = self._deduplicate(new_fact, candidates)
+            if decision.get("action", "new") not in ("duplicate", "update"):
+                queued.append(i)
+            decisions.append(decision)
+        return decisions
+
+    def _deduplicate(self, new_fact: str, candidates: list[dict]) -> dict:
+        """Check if a fact is new, duplicate, or an update of existing.
+
+        *candidates* are the memories within ``DEDUP_LOW`` similarity
+        (``_sim`` key), as built by ``_deduplicate_batch``.
+        """
         if not candidates:
             return {"action": "new"}
 
-        # If very high similarity (>0.92), it's a duplicate — no LLM needed
-        best = max(candidates, key=lambda x: x["_sim"])
-        if best["_sim"] > 0.92:
+        # Very high similarity → duplicate, no LLM needed
+        best = max(candidates, key=itemgetter("_sim"))
+        if best["_sim"] >= self.DEDUP_HIGH:
+            if best.get("id") is None:  # matches a fact queued earlier this turn
+                return {"action": "duplicate"}
             return {"action": "duplicate", "update_id": str(best.get("id"))}
 
-        # Moderate similarity — ask LLM
+        # Rows queued this turn have no id yet, so the LLM can't target them;
+        # of the rest, the LLM sees the 5 closest
+        candidates = heapq.nlargest(
+            5, (c for c in candidates if c.get("id") is not None), key=itemgetter("_sim")
+        )
+        if not candidates:
+            return {"action": "new"}
+
+        # Narrow ambiguous band (DEDUP_LOW ≤ sim < DEDUP_HIGH) — ask LLM
         from backend.services.llm_helper import llm
 
         existing_text = "\n".join(
             f'  [{m.get("id")}] ({m.get("category","")}) {m.get("content","")}'
-            for m in candidates[:5]
+            for m in candidates
         )
-        prompt = DEDUP_PROMPT.format(existing=existing_text, new_fact=new_fact)
+        prompt = DEDUP_TEMPLATE.format(existing=existing_text, new_fact=new_fact)
 
         try:
-            raw = llm.generate(prompt, role="classifier", use_cache=False)
+            raw = llm.generate(
+                prompt, role="classifier", use_cache=False,
+                system=DEDUP_SYSTEM, response_schema=DEDUP_SCHEMA,
+            )
             parsed = self._safe_json_obj(raw)
             if parsed:
-                return parsed
+                return self._check_target(parsed, candidates)
         except Exception:
             pass
 
         return {"action": "new"}
 
+    @staticmethod
+    def _check_target(decision: dict, candidates: list[dict]) -> dict:
+        """Drop an ``update_id`` the LLM made up (not one of *candidates*).
+
+        An update without a valid target is stored as a new fact instead;
+        a duplicate just skips the access boost.
+        """
+        action = decision.get("action", "new")
+        update_id = decision.get("update_id")
+        if action not in ("duplicate", "update") or update_id is None:
+            return decision
+        if str(update_id).strip() in {str(c.get("id")) for c in candidates}:
+            return {**decision, "update_id": str(update_id).strip()}
+        logger.info("Dedup returned unknown memory id %r — ignoring it", update_id)
+        return {"action": "new"} if action == "update" else {"action": "duplicate"}
+
     # ═══════════════════════════════════════════════════════════════════
     #  Internal: Storage operations
     # ═══════════════════════════════════════════════════════════════════
 
-    def _store_memory(
+    def _build_row(
         self,
         content: str,
         category: str,
         importance: int,
         embedding: list[float] | None,
-    ) -> dict | None:
-        """Insert a new memory into Supabase."""
+    ) -> dict:
+        """Build a ``memories`` row ready for insert."""
+        return {
+            "user_id": self.user_id,
+            "content": content,
+            "category": category,
+            "importance": importance,
+            "access_count": 0,
+            "embedding": orjson.dumps(embedding).decode() if embedding else None,
+        }
+
+    def _flush_rows(self, rows: list[dict]) -> list[dict]:
+        """Insert new memories into Supabase in a single request."""
         client = self._get_client()
-        if not client:
-            return None
+        if not client or not rows:
+            return []
         try:
-            row = {
-                "user_id": self.user_id,
-                "content": content,
-                "category": category,
-                "importance": importance,
-                "access_count": 0,
-                "embedding": json.dumps(embedding) if embedding else None,
-            }
-            res = client.table("memories").insert(row).execute()
-            if res.data:
-                stored = res.data[0]
-                stored.pop("embedding", None)  # don't return embedding in results
-                logger.info("Stored memory: [%s] %s (importance=%d)", category, content[:60], importance)
-                return stored
+            res = client.table("memories").insert(rows).execute()
+            stored = res.data or []
+            if stored:
+                self._invalidate_embeddings()
+            for mem in stored:
+                mem.pop("embedding", None)  # don't return embedding in results
+                logger.info(
+                    "Stored memory: [%s] %s (importance=%d)",
+                    mem.get("category"), mem.get("content", "")[:60], mem.get("importance", 5),
+                )
+            return stored
         except Exception as exc:
-            logger.warning("Store memory failed: %s", exc)
-        return None
+            logger.warning("Store memories failed: %s", exc)
+        return []
 
     def _update_memory(self, memory_id: str, new_content: str, importance: int) -> None:
         """Update an existing memory's content."""
@@ -538,55 +866,111 @@ class MemoryEngine:
         if not client:
             return
         try:
+            # updated_at is set by the set_updated_at trigger
             client.table("memories").update({
                 "content": new_content,
                 "importance": importance,
-                "updated_at": datetime.now(timezone.utc).isoformat(),
             }).eq("id", int(memory_id)).eq("user_id", self.user_id).execute()
+            self._invalidate_embeddings()
             logger.info("Updated memory %s: %s", memory_id, new_content[:60])
         except Exception as exc:
             logger.warning("Update memory failed: %s", exc)
 
     def _boost_memory(self, memory_id: int | str) -> None:
         """Increment access_count + update timestamp (recency boost)."""
+        self._boost_memories([memory_id])
+
+    def _boost_memories(self, memory_ids: list[int | str]) -> None:
+        """Boost several memories in one round-trip via ``boost_memories``."""
         client = self._get_client()
-        if not client:
+        if not client or not memory_ids:
             return
         try:
+            ids = [int(m) for m in memory_ids]
             # Use RPC if available, otherwise read-modify-write
-            res = (
-                client.table("memories")
-                .select("access_count")
-                .eq("id", int(memory_id))
-                .eq("user_id", self.user_id)
-                .maybe_single()
-                .execute()
-            )
-            if res.data:
-                new_count = (res.data.get("access_count") or 0) + 1
-                client.table("memories").update({
-                    "access_count": new_count,
-                    "updated_at": datetime.now(timezone.utc).isoformat(),
-                }).eq("id", int(memory_id)).execute()
+            boosted = False
+            if self._has_boost_rpc:
+                try:
+                    client.rpc("boost_memories", {"p_ids": ids, "p_user": self.user_id}).execute()
+                    boosted = True
+                except Exception as exc:
+                    self._rpc_failed("boost_memories", "_has_boost_rpc", exc)
+            if not boosted:
+                for memory_id in ids:
+                    res = (
+                        client.table("memories")
+                        .select("access_count")
+                        .eq("id", memory_id)
+                        .eq("user_id", self.user_id)
+                        .maybe_single()
+                        .execute()
+                    )
+                    if res.data:
+                        client.table("memories").update({
+                            "access_count": (res.data.get("access_count") or 0) + 1,
+                        }).eq("id", memory_id).execute()
+            # Keep the local-search cache in step without a reload
+            index = self._emb_index
+            if index is not None:
+                for memory_id in ids:
+                    if memory_id in index.ids:
+                        index.access[index.ids.index(memory_id)] += 1
         except Exception:
             pass  # non-critical
 
-    def _load_existing_memories(self) -> list[dict]:
-        """Load all memories for dedup comparison (with embeddings)."""
+    def _rpc_failed(self, name: str, flag: str, exc: Exception) -> None:
+        """Log a failed RPC; only a missing function turns *flag* off.
+
+        Engines live for the whole process, so a transient error (network
+        blip, statement timeout) falls back for this call only.
+        """
+        if is_missing_rpc(exc):
+            logger.info("%s RPC unavailable, using the client-side path: %s", name, exc)
+            setattr(self, flag, False)
+        else:
+            logger.warning("%s RPC failed, falling back for this call: %s", name, exc)
+
+    def _dedup_candidates_rpc(self, embedding: list[float] | None) -> list[dict] | None:
+        """Nearest existing memories for one fact via ``dedup_candidates``.
+
+        Returns ``None`` when the function isn't installed so the caller
+        can fall back to ``_load_existing_memories``.
+        """
+        if not embedding:
+            return []  # nothing to compare — the fact is new either way
+        if not self._has_dedup_rpc:
+            return None
         client = self._get_client()
         if not client:
             return []
         try:
-            res = (
-                client.table("memories")
-                .select("id, content, category, importance, embedding")
-                .eq("user_id", self.user_id)
-                .execute()
-            )
-            return res.data or []
+            res = client.rpc("dedup_candidates", {
+                "p_user": self.user_id,
+                "q": embedding,
+                "p_limit": 20,
+                "p_min_sim": self.DEDUP_LOW,
+            }).execute()
+        except Exception as exc:
+            self._rpc_failed("dedup_candidates", "_has_dedup_rpc", exc)
+            return None
+        return res.data or []
+
+    def _load_existing_memories(self) -> tuple[list[dict], np.ndarray]:
+        """Load all memories + their normalised embeddings for dedup.
+
+        Shares the local-search cache, so embeddings are downloaded at
+        most once between writes rather than on every turn.
+        """
+        empty = np.zeros((0, EMBEDDING_DIM), dtype=np.float32)
+        client = self._get_client()
+        if not client:
+            return [], empty
+        try:
+            index = self._embedding_index(client)
+            return list(index.rows), index.matrix.astype(np.float32) / EMBED_SCALE
         except Exception as exc:
             logger.warning("Load existing memories failed: %s", exc)
-            return []
+            return [], empty
 
     def _keyword_search(self, query: str, top_k: int) -> list[dict]:
         """Fallback text search when embeddings are not available."""
@@ -612,31 +996,166 @@ class MemoryEngine:
     # ═══════════════════════════════════════════════════════════════════
 
     def _embed(self, text: str) -> list[float] | None:
-        """Generate embedding vector using Gemini."""
+        """Embed a search query (cached per model + text).
+
+        Runs before every reply, so there is one short attempt and no
+        backoff — on failure the caller falls back to keyword search.
+        """
+        return self._embed_batch([text], attempts=1, timeout=EMBED_QUERY_TIMEOUT)[0]
+
+    def _embed_batch(
+        self,
+        texts: list[str],
+        *,
+        attempts: int = 5,
+        timeout: float | None = None,
+    ) -> list[list[float] | None]:
+        """Embed several texts in a single Gemini request.
+
+        Texts already in the embedding cache are served from it; only the
+        misses go to Gemini, with quota backoff over *attempts* tries.
+        Returns one entry per text (``None`` for the misses on failure).
+        """
+        if not texts:
+            return []
+        keys = [(self._embed_model, t[:EMBED_MAX_CHARS]) for t in texts]
+        with _EMBED_CACHE_LOCK:
+            cached = [_EMBED_CACHE.get(k) for k in keys]
+        out: list[list[float] | None] = [list(v) if v is not None else None for v in cached]
+
+        # Unique misses, in order — repeated texts in one batch embed once
+        missing = list(dict.fromkeys(k for k, v in zip(keys, cached) if v is None))
+        if not missing:
+            return out
         if not _genai_ok or not Config.GEMINI_API_KEY:
-            return None
+            return out
+        content = [k[1] for k in missing]
         try:
-            result = genai.embed_content(
-                model=self._embed_model,
-                content=text[:2000],
-                task_type="SEMANTIC_SIMILARITY",
+            result = call_with_backoff(
+                lambda: genai.embed_content(
+                    model=self._embed_model,
+                    content=content,
+                    task_type="SEMANTIC_SIMILARITY",
+                    output_dimensionality=EMBEDDING_DIM,
+                    **({"request_options": {"timeout": timeout}} if timeout else {}),
+                ),
+                gemini_bucket,
+                est_tokens=sum(len(t) for t in content) // 4,
+                attempts=attempts,
             )
-            return result["embedding"]
+            vectors = result["embedding"]
         except Exception as exc:
             logger.warning("Embedding failed: %s", exc)
-            return None
+            return out
+
+        fresh = {k: tuple(v) for k, v in zip(missing, vectors)}
+        with _EMBED_CACHE_LOCK:
+            _EMBED_CACHE.update(fresh)
+        for i, k in enumerate(keys):
+            if out[i] is None and k in fresh:
+                out[i] = list(fresh[k])
+        return out
+
+    def _backfill_embeddings(self) -> int:
+        """Re-embed this user's memories that lack an ``EMBEDDING_DIM`` vector.
+
+        New embeddings are pinned to 768 dimensions, but rows written with
+        the original 3072-d model keep their old vector (TEXT columns, no
+        §4b migration) or lost it (the ``halfvec(768)`` migration clears
+        them) — either way they only match on keywords.  Runs on the
+        background extraction thread, one batch per turn until nothing is
+        left.  Returns the rows updated.
+        """
+        client = self._get_client()
+        if not client or not _genai_ok or not Config.GEMINI_API_KEY:
+            self._backfilled = True
+            return 0
+        try:
+            res = (
+                client.table("memories")
+                .select("id, content, embedding")
+                .eq("user_id", self.user_id)
+                .execute()
+            )
+        except Exception as exc:
+            logger.warning("Embedding backfill query failed: %s", exc)
+            return 0
+        stale = [
+            r for r in res.data or []
+            if self._embedding_size(r.get("embedding")) != EMBEDDING_DIM
+        ]
+        rows = stale[:EMBED_BACKFILL_BATCH]
+
+        vectors = self._embed_batch([r["content"] for r in rows])
+        done = 0
+        for row, vec in zip(rows, vectors):
+            if vec is None:
+                continue
+            try:
+                client.table("memories").update({
+                    "embedding": orjson.dumps(vec).decode(),
+                }).eq("id", row["id"]).eq("user_id", self.user_id).execute()
+                done += 1
+            except Exception as exc:
+                logger.warning("Embedding backfill update failed: %s", exc)
+                break
+        if done:
+            self._invalidate_embeddings()
+            logger.info("Re-embedded %d memories for user %s", done, self.user_id)
+        # Every stale row fitted in this batch and was re-embedded
+        self._backfilled = done == len(stale)
+        return done
+
+    @staticmethod
+    def _embedding_size(emb: Any) -> int:
+        """Dimension of a stored embedding (list or ``"[...]"`` text); 0 if missing."""
+        if not emb:
+            return 0
+        if isinstance(emb, str):
+            return emb.count(",") + 1
+        return len(emb)
+
+    @staticmethod
+    def _epoch(iso: str | None) -> float:
+        """Unix time of a PostgREST timestamp; missing values count as now.
+
+        PostgREST emits ``+00:00`` offsets, so the ``Z`` rewrite (needed by
+        ``fromisoformat`` before Python 3.11) is only done when present.
+        """
+        if not iso:
+            return time.time()
+        if iso[-1] == "Z":
+            iso = iso[:-1] + "+00:00"
+        return datetime.fromisoformat(iso).timestamp()
+
+    @staticmethod
+    def _quantize(unit: np.ndarray) -> np.ndarray:
+        """Quantise unit-norm vectors to int8 (``EMBED_SCALE`` per unit).
+
+        Cosine similarity stays within ~0.01 of the float32 value, at a
+        quarter of the footprint for the long-lived search cache.
+        """
+        return np.clip(np.rint(unit * EMBED_SCALE), -EMBED_SCALE, EMBED_SCALE).astype(np.int8)
 
     @staticmethod
-    def _cosine_similarity(a: list[float], b: list[float]) -> float:
-        """Compute cosine similarity between two vectors."""
-        if not a or not b or len(a) != len(b):
-            return 0.0
-        dot = sum(x * y for x, y in zip(a, b))
-        norm_a = sum(x * x for x in a) ** 0.5
-        norm_b = sum(x * x for x in b) ** 0.5
-        if norm_a == 0 or norm_b == 0:
-            return 0.0
-        return dot / (norm_a * norm_b)
+    def _stack_embeddings(embeddings: list[Any]) -> np.ndarray:
+        """Stack embeddings into an L2-normalised ``(N, EMBEDDING_DIM)`` matrix.
+
+        Accepts lists or JSON strings; missing or wrongly sized vectors
+        become zero rows (similarity 0 with everything).
+        """
+        matrix = np.zeros((len(embeddings), EMBEDDING_DIM), dtype=np.float32)
+        for i, emb in enumerate(embeddings):
+            if not emb:
+                continue
+            if isinstance(emb, str):
+                emb = orjson.loads(emb)
+            if len(emb) == EMBEDDING_DIM:
+                matrix[i] = emb
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        matrix /= norms
+        return matrix
 
     # ═══════════════════════════════════════════════════════════════════
     #  Internal: JSON parsing helpers
@@ -644,7 +1163,18 @@ class MemoryEngine:
 
     @staticmethod
     def _safe_json_array(text: str) -> list[dict] | None:
-        """Parse a JSON array from raw LLM output."""
+        """Parse a JSON array from raw LLM output.
+
+        JSON-mode responses parse on the first ``json.loads``; the fence
+        stripping and bracket scan only run for free-form output.
+        """
+        try:
+            result = json.loads(text)
+            if isinstance(result, list):
+                return result
+        except json.JSONDecodeError:
+            pass
+
         text = text.strip()
         # Strip markdown fences
         if text.startswith("```"):
@@ -674,7 +1204,14 @@ class MemoryEngine:
 
     @staticmethod
     def _safe_json_obj(text: str) -> dict | None:
-        """Parse a JSON object from raw LLM output."""
+        """Parse a JSON object from raw LLM output (JSON-mode fast path first)."""
+        try:
+            result = json.loads(text)
+            if isinstance(result, dict):
+                return result
+        except json.JSONDecodeError:
+            pass
+
         text = text.strip()
         if text.startswith("```"):
             text = text.split("\n", 1)[-1]
@@ -705,11 +1242,17 @@ class MemoryEngine:
 #  Module-level helper: get or create engine for current user
 # ═══════════════════════════════════════════════════════════════════════
 
-_engines: dict[str, MemoryEngine] = {}
+# LRU of per-user engines.  Eviction only drops the reference: the engine
+# may still be extracting on _extract_pool or held by another session, so
+# it is left for the garbage collector once that work finishes.
+_engines: LRUCache = LRUCache(maxsize=1024)
+_engines_lock = threading.Lock()
 
 
 def get_memory_engine(user_id: str) -> MemoryEngine:
     """Return (or create) a MemoryEngine for the given user."""
-    if user_id not in _engines:
-        _engines[user_id] = MemoryEngine(user_id)
-    return _engines[user_id]
+    with _engines_lock:
+        engine = _engines.get(user_id)
+        if engine is None:
+            engine = _engines[user_id] = MemoryEngine(user_id)
+        return engine
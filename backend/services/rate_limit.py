@@ -0,0 +1,135 @@
+"""Client-side rate limiting for Gemini calls.
+
+Gemini's free tier answers bursts with 429s, and the retries those trigger
+multiply turn latency.  A process-wide token bucket paces requests (and
+estimated tokens) to stay under the configured RPM / TPM, and
+``call_with_backoff`` retries the quota errors that still get through.
+
+Usage::
+
+    from backend.services.rate_limit import gemini_bucket, call_with_backoff
+
+    with gemini_bucket.acquire(est_tokens=len(prompt) // 4):
+        response = model.generate_content(prompt)
+
+    result = call_with_backoff(lambda: genai.embed_content(...), gemini_bucket)
+"""
+
+from __future__ import annotations
+
+import logging
+import random
+import threading
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from typing import TypeVar
+
+from backend.config import Config
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+_MAX_BACKOFF = 60.0  # seconds
+
+
+class TokenBucket:
+    """Thread-safe token bucket over requests per minute and tokens per minute.
+
+    Capacity refills continuously (lazily, on each ``acquire``), so no
+    background thread is needed.  ``tpm=0`` disables the token budget.
+    """
+
+    def __init__(self, rpm: int, tpm: int = 0) -> None:
+        self.rpm = rpm
+        self.tpm = tpm
+        self._requests = float(rpm)
+        self._tokens = float(tpm)
+        self._updated = time.monotonic()
+        self._cond = threading.Condition()
+        self._acquired = 0
+        self._retries = 0
+        self._waited = 0.0
+
+    def _refill(self, now: float) -> None:
+        elapsed = now - self._updated
+        self._updated = now
+        self._requests = min(self.rpm, self._requests + elapsed * self.rpm / 60.0)
+        if self.tpm:
+            self._tokens = min(self.tpm, self._tokens + elapsed * self.tpm / 60.0)
+
+    @contextmanager
+    def acquire(self, est_tokens: int = 0) -> Iterator[None]:
+        """Block until one request (and *est_tokens*) fit the budget."""
+        if self.rpm <= 0:  # limiter disabled
+            yield
+            return
+        tokens = min(est_tokens, self.tpm) if self.tpm else 0
+        start = time.monotonic()
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+                if self._requests >= 1 and self._tokens >= tokens:
+                    self._requests -= 1
+                    self._tokens -= tokens
+                    break
+                need_req = max(0.0, 1 - self._requests) * 60.0 / self.rpm
+                need_tok = max(0.0, tokens - self._tokens) * 60.0 / self.tpm if tokens else 0.0
+                self._cond.wait(max(need_req, need_tok, 0.01))
+            self._acquired += 1
+            self._waited += time.monotonic() - start
+        yield
+
+    def record_retry(self) -> None:
+        with self._cond:
+            self._retries += 1
+
+    def stats(self) -> dict[str, float]:
+        """Counters for the admin dashboard / logs."""
+        with self._cond:
+            return {
+                "acquired": self._acquired,
+                "retries": self._retries,
+                "waited_s": round(self._waited, 2),
+            }
+
+
+def is_quota_error(exc: Exception) -> bool:
+    """True for errors worth backing off on (quota, overload, gateway timeout)."""
+    if type(exc).__name__ in ("ResourceExhausted", "ServiceUnavailable", "DeadlineExceeded"):
+        return True
+    err = str(exc)
+    return any(code in err for code in ("429", "503", "504")) or "ResourceExhausted" in err
+
+
+def call_with_backoff(
+    fn: Callable[[], T],
+    bucket: TokenBucket,
+    *,
+    est_tokens: int = 0,
+    attempts: int = 5,
+) -> T:
+    """Run *fn* inside *bucket*, retrying quota errors with jittered backoff.
+
+    Sleeps ``min(60, 2**attempt + jitter)`` between attempts; any other
+    error (or the last quota error) propagates.
+    """
+    for attempt in range(1, attempts):
+        try:
+            with bucket.acquire(est_tokens):
+                return fn()
+        except Exception as exc:
+            if not is_quota_error(exc):
+                raise
+            bucket.record_retry()
+            delay = min(_MAX_BACKOFF, 2 ** attempt + random.random())
+            logger.warning("Gemini quota/overload — retry in %.1fs (%d/%d)", delay, attempt, attempts)
+            time.sleep(delay)
+    with bucket.acquire(est_tokens):
+        return fn()
+
+
+# Shared by every Gemini call in the process (LLM + embeddings)
+gemini_bucket = TokenBucket(rpm=Config.GEMINI_RPM, tpm=Config.GEMINI_TPM)
@@ -7,10 +7,19 @@ is a safe no-op in that case.
 
 from __future__ import annotations
 
-import json
+import atexit
+import base64
 import logging
-from typing import TYPE_CHECKING, Any
-
+import random
+import re
+import threading
+import time
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+from typing import TYPE_CHECKING, Any, TypeVar
+
+import orjson
 import streamlit as st
 
 from backend.config import Config
@@ -20,14 +29,97 @@ if TYPE_CHECKING:
 
 logger = logging.getLogger(__name__)
 
+T = TypeVar("T")
+
 # ── Lazy import so the app still loads when supabase isn't installed ───
 _supabase_available: bool = False
 try:
-    from supabase import create_client  # type: ignore
+    from supabase import ClientOptions, create_client  # type: ignore
     _supabase_available = True
 except ImportError:
     pass
 
+# Credentials are read once at startup (admin overrides never touch them)
+_CONFIGURED: bool = (
+    _supabase_available
+    and bool(getattr(Config, "SUPABASE_URL", None))
+    and bool(getattr(Config, "SUPABASE_KEY", None))
+)
+
+_httpx_available: bool = False
+try:
+    import httpx
+    _httpx_available = True
+except ImportError:
+    pass
+
+# One keep-alive connection pool shared by every Supabase client in the
+# process.  Only the *transport* is shared — each client still gets its own
+# ``httpx.Client`` because postgrest writes the user's JWT into the client's
+# default headers.
+_transport: "httpx.HTTPTransport | None" = None
+_transport_lock = threading.Lock()
+
+
+def _shared_transport() -> "httpx.HTTPTransport":
+    """Build (once) the pooled HTTP/2 transport."""
+    global _transport
+    with _transport_lock:
+        if _transport is None:
+            limits = httpx.Limits(
+                max_connections=30, max_keepalive_connections=20, keepalive_expiry=30.0
+            )
+            try:
+                _transport = httpx.HTTPTransport(http2=True, retries=2, limits=limits)
+            except ImportError:  # h2 not installed → pooled HTTP/1.1
+                _transport = httpx.HTTPTransport(retries=2, limits=limits)
+            atexit.register(_transport.close)
+        return _transport
+
+
+# Client-side cap on a PostgREST / Storage request (seconds).  The matching
+# server-side ``statement_timeout`` is set per role — see SUPABASE_SETUP.md §4c.
+_REQUEST_TIMEOUT = 10.0
+
+# Longest a page waits on GoTrue in ``restore_session`` (seconds)
+_RESTORE_TIMEOUT = 5.0
+
+# ``restore_session`` skips GoTrue while the token has this long left (s)
+_RESTORE_MARGIN = 60
+
+# Refresh the access token this many seconds before it expires
+_REFRESH_MARGIN = 30
+
+# Per-session cache lifetime of the admin_settings row (seconds)
+_SETTINGS_TTL = 60.0
+
+# Rows per request when paging admin tables (Supabase's default max-rows)
+_PAGE_SIZE = 1000
+
+# Error codes meaning "this RPC isn't installed" (see ``is_missing_rpc``)
+_MISSING_RPC_CODES = ("PGRST202", "42883")
+
+# Retries for transient failures in ``_execute_with_reconnect``
+_DB_ATTEMPTS = 3
+_DB_BACKOFF_BASE = 0.2  # seconds
+_DB_BACKOFF_CAP = 2.0
+
+# Fan-out pool for independent queries (see ``_gather``)
+_io_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="supabase")
+
+# session_state key of the per-session ``(access_token, Client)`` pair
+_CLIENT_KEY = "_supabase_client"
+# session_state key of chat rows queued by ``save_message(..., flush=False)``
+_PENDING_KEY = "_pending_messages"
+# session_state key of in-flight background chat inserts (futures)
+_WRITES_KEY = "_pending_writes"
+# session_state key of ``(user id, monotonic time, settings JSON)``
+_SETTINGS_KEY = "_admin_settings"
+# Revision counters bumped by writes; read caches are valid for one revision
+_MSGS_REV = "msgs_rev"
+_PROFILE_REV = "prof_rev"
+_PROFILE_TTL = 30.0  # seconds
+
 
 # ═══════════════════════════════════════════════════════════════════════
 #  SupabaseManager — singleton-free, every method is @classmethod
@@ -41,31 +133,60 @@ class SupabaseManager:
       fallback so callers never have to guard with ``if``.
     """
 
+    # Cleared if the SQL functions from docs/SUPABASE_SETUP.md §2 / §2b are missing
+    _has_clear_rpc: bool = True
+    _has_counts_rpc: bool = True
+
     # ── status ────────────────────────────────────────────────────────
 
     @classmethod
     def is_configured(cls) -> bool:
         """``True`` when Supabase URL **and** key are present and the
         library is installed."""
-        return (
-            _supabase_available
-            and bool(getattr(Config, "SUPABASE_URL", None))
-            and bool(getattr(Config, "SUPABASE_KEY", None))
-        )
+        return _CONFIGURED
 
     # ── internal client helpers ────────────────────────────────────────
 
     @classmethod
     def _new_client(cls) -> "Client":
         """Fresh Supabase client (no session).  Caller must check
-        ``is_configured()`` first."""
-        return create_client(Config.SUPABASE_URL, Config.SUPABASE_KEY)
+        ``is_configured()`` first.
+
+        Connections come from the process-wide pool, so a new client
+        doesn't pay for a new TLS handshake.
+        """
+        options = ClientOptions(
+            postgrest_client_timeout=_REQUEST_TIMEOUT,
+            storage_client_timeout=_REQUEST_TIMEOUT,
+        )
+        if _httpx_available:
+            options.httpx_client = httpx.Client(
+                transport=_shared_transport(),
+                timeout=httpx.Timeout(_REQUEST_TIMEOUT, connect=5.0, pool=5.0),
+            )
+        return create_client(Config.SUPABASE_URL, Config.SUPABASE_KEY, options=options)
 
     @classmethod
     def _authed_client(cls) -> "Client":
-        """Client with the current user's JWT set so that RLS applies."""
-        client = cls._new_client()
+        """Client with the current user's JWT set so that RLS applies.
+
+        Built once per browser session and reused until the stored access
+        token changes, so ``create_client`` + ``set_session`` don't run on
+        every query.  Cached in ``session_state`` (not at module level) so
+        one user's session can never leak into another's requests.
+        """
         tokens = st.session_state.get("auth_tokens")
+        exp = tokens.get("expires_at") if tokens else None
+        if exp and time.time() > exp - _REFRESH_MARGIN:
+            client = cls._refresh_client(tokens["refresh_token"])
+            if client is not None:
+                return client
+        token = tokens["access_token"] if tokens else None
+        cached = st.session_state.get(_CLIENT_KEY)
+        if cached is not None and cached[0] == token:
+            return cached[1]
+
+        client = cls._new_client()
         if tokens:
             try:
                 client.auth.set_session(
@@ -73,8 +194,28 @@ class SupabaseManager:
                 )
             except Exception:
                 pass                       # caller will get an RLS / 401
+        st.session_state[_CLIENT_KEY] = (token, client)
+        return client
+
+    @classmethod
+    def _refresh_client(cls, refresh_token: str) -> "Client | None":
+        """Trade the refresh token for a new session; ``None`` on failure."""
+        try:
+            client = cls._new_client()
+            res = client.auth.refresh_session(refresh_token)
+        except Exception as exc:
+            logger.warning("Token refresh failed: %s", exc)
+            return None
+        if not (res and res.session):
+            return None
+        _store_session(res.session, res.user, client)
         return client
 
+    @classmethod
+    def reset_client(cls) -> None:
+        """Drop this session's cached client (next call builds a new one)."""
+        st.session_state.pop(_CLIENT_KEY, None)
+
     # ═══════════════════════════════════════════════════════════════════
     #  Authentication
     # ═══════════════════════════════════════════════════════════════════
@@ -104,10 +245,9 @@ class SupabaseManager:
 
             if session:
                 # email-confirmation disabled → logged in immediately
-                _store_session(session, user)
                 return {
                     "success": True,
-                    "user": _user_dict(user),
+                    "user": _store_session(session, user, client),
                     "needs_confirm": False,
                 }
             # email-confirmation enabled
@@ -132,8 +272,7 @@ class SupabaseManager:
             res = client.auth.sign_in_with_password(
                 {"email": email, "password": password}
             )
-            _store_session(res.session, res.user)
-            return {"success": True, "user": _user_dict(res.user)}
+            return {"success": True, "user": _store_session(res.session, res.user, client)}
         except Exception as exc:
             logger.warning("sign_in failed: %s", exc)
             return {"success": False, "error": _friendly_error(exc)}
@@ -142,13 +281,9 @@ class SupabaseManager:
     def sign_out(cls) -> None:
         """Sign out server-side, then wipe local session."""
         try:
-            tokens = st.session_state.get("auth_tokens")
-            if tokens:
-                client = cls._new_client()
-                client.auth.set_session(
-                    tokens["access_token"], tokens["refresh_token"]
-                )
-                client.auth.sign_out()
+            if st.session_state.get("auth_tokens"):
+                # the cached client already carries the session
+                cls._authed_client().auth.sign_out()
         except Exception as exc:
             logger.warning("sign_out remote call failed (ignored): %s", exc)
         _clear_session()
@@ -169,23 +304,36 @@ class SupabaseManager:
         """Re-validate stored tokens.  Returns user dict or ``None``.
 
         Called once per page load to see if the user is "still" logged in
-        from a previous interaction.
+        from a previous interaction.  The GoTrue call runs on the I/O pool
+        and is waited on for at most ``_RESTORE_TIMEOUT`` seconds; on a
+        timeout the tokens are kept so the next run can try again.
         """
         tokens = st.session_state.get("auth_tokens")
         if not tokens:
             return None
+        # Still well inside its lifetime → no need to ask GoTrue.  The token
+        # came from our own session_state, and RLS re-checks it server-side.
+        user = st.session_state.get("auth_user")
+        exp = tokens.get("expires_at") or _jwt_exp(tokens["access_token"])
+        if user and exp - time.time() > _RESTORE_MARGIN:
+            st.session_state["authenticated"] = True
+            return user
         try:
             client = cls._new_client()
-            res = client.auth.set_session(
-                tokens["access_token"], tokens["refresh_token"]
+            future = _io_pool.submit(
+                client.auth.set_session, tokens["access_token"], tokens["refresh_token"]
             )
-            if res and res.session:
-                # tokens may have been refreshed — persist the new ones
-                _store_session(res.session, res.user)
-                return _user_dict(res.user)
+            res = future.result(timeout=_RESTORE_TIMEOUT)
+        except FutureTimeout:
+            logger.warning("Session restore timed out after %ss", _RESTORE_TIMEOUT)
+            return None
         except Exception as exc:
             logger.warning("Session restore failed: %s", exc)
             _clear_session()
+            return None
+        if res and res.session:
+            # tokens may have been refreshed — persist the new ones
+            return _store_session(res.session, res.user, client)
         return None
 
     # ═══════════════════════════════════════════════════════════════════
@@ -194,16 +342,24 @@ class SupabaseManager:
 
     @classmethod
     def get_profile(cls, user_id: str) -> dict | None:
-        """Fetch the profile row for *user_id* (or ``None``)."""
+        """Fetch the profile row for *user_id* (or ``None``).
+
+        Served from ``session_state`` until ``update_profile`` runs or
+        ``_PROFILE_TTL`` expires (edits made from another device).
+        """
+        key = f"_profile:{user_id}"
+        found, cached = _session_cache_get(key, _PROFILE_REV, _PROFILE_TTL)
+        if found:
+            return cached
         try:
-            client = cls._authed_client()
-            res = (
-                client.table("profiles")
+            res = _execute_with_reconnect(
+                lambda c: c.table("profiles")
                 .select("*")
                 .eq("id", user_id)
                 .maybe_single()
                 .execute()
             )
+            _session_cache_put(key, _PROFILE_REV, res.data)
             return res.data
         except Exception as exc:
             logger.warning("get_profile failed: %s", exc)
@@ -213,8 +369,10 @@ class SupabaseManager:
     def update_profile(cls, user_id: str, data: dict) -> bool:
         """Update one or more profile columns for *user_id*."""
         try:
-            client = cls._authed_client()
-            client.table("profiles").update(data).eq("id", user_id).execute()
+            _execute_with_reconnect(
+                lambda c: c.table("profiles").update(data).eq("id", user_id).execute()
+            )
+            _bump_rev(_PROFILE_REV)
             return True
         except Exception as exc:
             logger.warning("update_profile failed: %s", exc)
@@ -231,62 +389,144 @@ class SupabaseManager:
         role: str,
         content: str,
         sources: list | None = None,
+        *,
+        flush: bool = True,
     ) -> None:
-        """Persist a single chat message to Supabase."""
+        """Persist a chat message to Supabase.
+
+        With ``flush=False`` the row is only queued for this session and
+        goes out with the next flushing ``save_message`` (or before
+        ``load_messages``) — e.g. the user message rides along with the
+        assistant reply in a single insert.
+        """
+        pending = st.session_state.setdefault(_PENDING_KEY, [])
+        pending.append(_message_row(user_id, role, content, sources))
+        if flush:
+            cls.flush_messages()
+
+    @classmethod
+    def flush_messages(cls) -> None:
+        """Send any chat rows queued in this session."""
+        pending = st.session_state.pop(_PENDING_KEY, None)
+        if pending:
+            cls.save_messages(pending)
+
+    @classmethod
+    def save_messages(cls, rows: list[dict]) -> None:
+        """Insert several ``chat_history`` rows in one request.
+
+        The insert runs on the I/O pool so the page doesn't wait for it;
+        ``wait_for_writes`` (called before chat reads / deletes) joins it.
+        Failures are logged, never raised — persistence must not break the
+        chat turn.
+        """
         try:
-            client = cls._authed_client()
-            client.table("chat_history").insert(
-                {
-                    "user_id": user_id,
-                    "role": role,
-                    "content": content,
-                    "sources": json.dumps(sources) if sources else None,
-                }
-            ).execute()
+            _bump_rev(_MSGS_REV)
+            client = cls._authed_client()  # resolve here — workers have no session_state
         except Exception as exc:
-            logger.warning("save_message failed: %s", exc)
+            logger.warning("save_messages failed (%d rows): %s", len(rows), exc)
+            return
+
+        def insert() -> None:
+            try:
+                # not idempotent — only retried if the request was never sent
+                _execute_with_reconnect(
+                    lambda c: c.table("chat_history").insert(rows).execute(),
+                    idempotent=False,
+                    client=client,
+                )
+            except Exception as exc:
+                logger.warning("save_messages failed (%d rows): %s", len(rows), exc)
+
+        writes = st.session_state.setdefault(_WRITES_KEY, [])
+        writes[:] = [f for f in writes if not f.done()]
+        writes.append(_io_pool.submit(insert))
 
     @classmethod
-    def load_messages(cls, user_id: str, limit: int = 100) -> list[dict]:
-        """Load the most recent chat messages for a user (oldest first)."""
-        try:
-            client = cls._authed_client()
-            res = (
+    def wait_for_writes(cls) -> None:
+        """Block until this session's background chat inserts have finished."""
+        for future in st.session_state.pop(_WRITES_KEY, ()):
+            future.result()
+
+    @classmethod
+    def load_messages(
+        cls, user_id: str, limit: int = 100, since: str | None = None
+    ) -> list[dict]:
+        """Load the most recent chat messages for a user (oldest first).
+
+        Fetches newest-first so Postgres can stop after *limit* rows on the
+        ``(user_id, created_at)`` index, then flips the page.  *since* (an
+        ISO timestamp) restricts to messages created after it, for
+        incremental polls.  Served from ``session_state`` until the next
+        chat write.
+        """
+        cls.flush_messages()
+        cls.wait_for_writes()
+        key = f"_msgs:{user_id}:{limit}:{since}"
+        found, cached = _session_cache_get(key, _MSGS_REV)
+        if found:
+            return list(cached)
+        def fetch(client: "Client") -> Any:
+            q = (
                 client.table("chat_history")
-                .select("role, content, sources, created_at")
+                .select("role, content, sources")
                 .eq("user_id", user_id)
-                .order("created_at", desc=False)
+            )
+            if since:
+                q = q.gt("created_at", since)
+            return (
+                # rows inserted together share created_at; id keeps their order
+                q.order("created_at", desc=True)
+                .order("id", desc=True)
                 .limit(limit)
                 .execute()
             )
+
+        try:
+            res = _execute_with_reconnect(fetch)
             messages: list[dict] = []
             for row in res.data or []:
-                sources = row.get("sources")
-                if isinstance(sources, str):
-                    try:
-                        sources = json.loads(sources)
-                    except json.JSONDecodeError:
-                        sources = None
                 messages.append(
                     {
                         "role": row["role"],
                         "content": row["content"],
-                        "sources": sources,
+                        "sources": _decode_sources(row.get("sources")),
                     }
                 )
-            return messages
+            messages.reverse()
+            _session_cache_put(key, _MSGS_REV, messages)
+            return list(messages)
         except Exception as exc:
             logger.warning("load_messages failed: %s", exc)
             return []
 
     @classmethod
     def clear_messages(cls, user_id: str) -> bool:
-        """Delete **all** chat messages for a user."""
+        """Delete **all** chat messages for a user.
+
+        One ``clear_chat_history`` RPC (docs/SUPABASE_SETUP.md §2) when
+        installed, else a filtered REST delete.
+        """
+        cls.wait_for_writes()  # an in-flight insert must not land after the delete
         try:
-            client = cls._authed_client()
-            client.table("chat_history").delete().eq(
-                "user_id", user_id
-            ).execute()
+            cleared = False
+            if cls._has_clear_rpc:
+                try:
+                    _execute_with_reconnect(
+                        lambda c: c.rpc("clear_chat_history", {"uid": user_id}).execute()
+                    )
+                    cleared = True
+                except Exception as exc:
+                    if is_missing_rpc(exc):
+                        logger.info("clear_chat_history RPC unavailable, deleting via REST: %s", exc)
+                        cls._has_clear_rpc = False
+                    else:
+                        logger.warning("clear_chat_history RPC failed, deleting via REST: %s", exc)
+            if not cleared:
+                _execute_with_reconnect(
+                    lambda c: c.table("chat_history").delete().eq("user_id", user_id).execute()
+                )
+            _bump_rev(_MSGS_REV)
             return True
         except Exception as exc:
             logger.warning("clear_messages failed: %s", exc)
@@ -297,15 +537,15 @@ class SupabaseManager:
     # ═══════════════════════════════════════════════════════════════════
 
     @classmethod
-    def admin_list_users(cls) -> list[dict]:
+    def admin_list_users(cls, *, client: "Client | None" = None) -> list[dict]:
         """List all users via the profiles table.
 
         Returns list of dicts with id, full_name, preferred_language,
         location, created_at.  Requires an admin-level RLS policy or
-        service_role key.
+        service_role key.  (*client*: see ``admin_fetch``.)
         """
         try:
-            client = cls._authed_client()
+            client = client or cls._authed_client()
             res = (
                 client.table("profiles")
                 .select("id, full_name, preferred_language, location, phone, created_at, updated_at")
@@ -318,92 +558,139 @@ class SupabaseManager:
             return []
 
     @classmethod
-    def admin_get_all_chat_history(cls, user_id: str | None = None, limit: int = 500) -> list[dict]:
-        """Fetch chat history for one user or all users.
+    def admin_get_all_chat_history(
+        cls,
+        user_id: str | None = None,
+        limit: int = 500,
+        offset: int = 0,
+        *,
+        client: "Client | None" = None,
+    ) -> list[dict]:
+        """Fetch chat history for one user or all users, newest first.
 
         Returns list of dicts with id, user_id, role, content, sources,
-        created_at.
+        created_at.  Rows *offset* … *offset + limit - 1* are fetched in
+        pages (see ``_fetch_pages``).
         """
-        try:
-            client = cls._authed_client()
+        client = client or cls._authed_client()
+
+        def query() -> Any:
             q = (
                 client.table("chat_history")
                 .select("id, user_id, role, content, sources, created_at")
             )
             if user_id:
                 q = q.eq("user_id", user_id)
-            res = q.order("created_at", desc=True).limit(limit).execute()
-            rows = res.data or []
+            return q.order("created_at", desc=True).order("id", desc=True)
+
+        try:
+            rows = _fetch_pages(query, limit, offset)
             for row in rows:
-                src = row.get("sources")
-                if isinstance(src, str):
-                    try:
-                        row["sources"] = json.loads(src)
-                    except json.JSONDecodeError:
-                        row["sources"] = None
+                row["sources"] = _decode_sources(row.get("sources"))
             return rows
         except Exception as exc:
             logger.warning("admin_get_all_chat_history failed: %s", exc)
             return []
 
     @classmethod
-    def admin_get_all_memories(cls, user_id: str | None = None, limit: int = 500) -> list[dict]:
-        """Fetch memories for one user or all users."""
-        try:
-            client = cls._authed_client()
+    def admin_get_all_memories(
+        cls,
+        user_id: str | None = None,
+        limit: int = 500,
+        offset: int = 0,
+        *,
+        client: "Client | None" = None,
+    ) -> list[dict]:
+        """Fetch memories for one user or all users, newest first (paged
+        like ``admin_get_all_chat_history``)."""
+        client = client or cls._authed_client()
+
+        def query() -> Any:
             q = (
                 client.table("memories")
                 .select("id, user_id, content, category, importance, access_count, created_at, updated_at")
             )
             if user_id:
                 q = q.eq("user_id", user_id)
-            res = q.order("created_at", desc=True).limit(limit).execute()
-            return res.data or []
+            return q.order("created_at", desc=True).order("id", desc=True)
+
+        try:
+            return _fetch_pages(query, limit, offset)
         except Exception as exc:
             logger.warning("admin_get_all_memories failed: %s", exc)
             return []
 
     @classmethod
     def admin_delete_user_data(cls, user_id: str) -> dict:
-        """Delete all chat history + memories for a user (admin action)."""
-        results = {"chat_deleted": False, "memories_deleted": False}
-        try:
-            client = cls._authed_client()
-            client.table("chat_history").delete().eq("user_id", user_id).execute()
-            results["chat_deleted"] = True
-        except Exception as exc:
-            logger.warning("admin_delete_user_data: chat deletion failed: %s", exc)
-        try:
-            client = cls._authed_client()
-            client.table("memories").delete().eq("user_id", user_id).execute()
-            results["memories_deleted"] = True
-        except Exception as exc:
-            logger.warning("admin_delete_user_data: memories deletion failed: %s", exc)
-        return results
+        """Delete all chat history + memories for a user (admin action).
+
+        The two deletes are independent, so they run concurrently.
+        """
+        client = cls._authed_client()
+
+        def delete(table: str) -> bool:
+            try:
+                client.table(table).delete().eq("user_id", user_id).execute()
+                return True
+            except Exception as exc:
+                logger.warning("admin_delete_user_data: %s deletion failed: %s", table, exc)
+                return False
+
+        chat_deleted, memories_deleted = _gather(
+            lambda: delete("chat_history"),
+            lambda: delete("memories"),
+        )
+        return {"chat_deleted": chat_deleted, "memories_deleted": memories_deleted}
 
     @classmethod
-    def admin_get_counts(cls) -> dict:
-        """Return aggregate counts for the admin dashboard."""
-        counts = {"users": 0, "messages": 0, "memories": 0}
-        try:
-            client = cls._authed_client()
-            r = client.table("profiles").select("id", count="exact").execute()
-            counts["users"] = r.count if r.count is not None else len(r.data or [])
-        except Exception:
-            pass
-        try:
-            client = cls._authed_client()
-            r = client.table("chat_history").select("id", count="exact").execute()
-            counts["messages"] = r.count if r.count is not None else len(r.data or [])
-        except Exception:
-            pass
-        try:
-            client = cls._authed_client()
-            r = client.table("memories").select("id", count="exact").execute()
-            counts["memories"] = r.count if r.count is not None else len(r.data or [])
-        except Exception:
-            pass
-        return counts
+    def admin_get_counts(cls, *, client: "Client | None" = None) -> dict:
+        """Return aggregate counts for the admin dashboard.
+
+        One ``admin_counts`` RPC (docs/SUPABASE_SETUP.md §2b) when
+        installed; otherwise three count queries run concurrently.
+        """
+        client = client or cls._authed_client()
+        if cls._has_counts_rpc:
+            try:
+                data = client.rpc("admin_counts").execute().data
+                return {k: int(data.get(k) or 0) for k in ("users", "messages", "memories")}
+            except Exception as exc:
+                if is_missing_rpc(exc):
+                    logger.info("admin_counts RPC unavailable, counting per table: %s", exc)
+                    cls._has_counts_rpc = False
+                else:
+                    logger.warning("admin_counts RPC failed, counting per table: %s", exc)
+
+        def count(table: str) -> int:
+            try:
+                # HEAD request: only the Content-Range header comes back
+                r = client.table(table).select("id", count="exact", head=True).execute()
+                return r.count or 0
+            except Exception:
+                return 0
+
+        users, messages, memories = _gather(
+            lambda: count("profiles"),
+            lambda: count("chat_history"),
+            lambda: count("memories"),
+        )
+        return {"users": users, "messages": messages, "memories": memories}
+
+    @classmethod
+    def admin_fetch(cls, *loaders: Callable[["Client"], T]) -> list[T]:
+        """Run admin dataset loaders concurrently; results in call order.
+
+        Each loader is called with the admin's client, resolved here
+        because pool workers can't read ``session_state``.  The first
+        loader runs on the calling thread — pass counts first, since their
+        fallback fans out on the pool itself.
+        """
+        if not loaders:
+            return []
+        client = cls._authed_client()
+        futures = [_io_pool.submit(fn, client) for fn in loaders[1:]]
+        first = loaders[0](client)
+        return [first, *(f.result() for f in futures)]
 
     # ═══════════════════════════════════════════════════════════════════
     #  Admin settings persistence (Supabase → survives deploys)
@@ -413,11 +700,31 @@ class SupabaseManager:
     def load_admin_settings(cls) -> dict | None:
         """Load admin settings from the ``admin_settings`` table.
 
-        Returns the parsed settings dict, or ``None`` if the table
-        does not exist or has no rows.
+        Returns the parsed settings dict, or ``None`` if the table does not
+        exist, has no rows, or RLS hides it (non-admins).  A successful
+        read is cached for ``_SETTINGS_TTL`` seconds in this session, keyed
+        by the signed-in user — never process-wide, since what a caller
+        may read depends on who they are.  ``None`` is never cached, so an
+        admin can't be handed a miss (and then overwrite the row with
+        defaults).  Cached as JSON bytes: every caller gets its own dict.
         """
         if not cls.is_configured():
             return None
+        user_id = _session_user_id()
+        cached = st.session_state.get(_SETTINGS_KEY)
+        if (
+            cached is not None
+            and cached[0] == user_id
+            and time.monotonic() - cached[1] < _SETTINGS_TTL
+        ):
+            return orjson.loads(cached[2])
+        settings = cls._fetch_admin_settings()
+        if settings is not None:
+            st.session_state[_SETTINGS_KEY] = (user_id, time.monotonic(), orjson.dumps(settings))
+        return settings
+
+    @classmethod
+    def _fetch_admin_settings(cls) -> dict | None:
         try:
             client = cls._authed_client()
             res = (
@@ -430,7 +737,7 @@ class SupabaseManager:
             if res.data:
                 raw = res.data.get("settings")
                 if isinstance(raw, str):
-                    return json.loads(raw)
+                    return orjson.loads(raw)
                 if isinstance(raw, dict):
                     return raw
         except Exception as exc:
@@ -449,9 +756,12 @@ class SupabaseManager:
         try:
             client = cls._authed_client()
             client.table("admin_settings").upsert(
-                {"id": "global", "settings": json.dumps(settings, ensure_ascii=False)},
+                {"id": "global", "settings": orjson.dumps(settings).decode()},
                 on_conflict="id",
             ).execute()
+            st.session_state[_SETTINGS_KEY] = (
+                _session_user_id(), time.monotonic(), orjson.dumps(settings)
+            )
             return True
         except Exception as exc:
             logger.warning("save_admin_settings failed: %s", exc)
@@ -463,6 +773,132 @@ class SupabaseManager:
 # ═══════════════════════════════════════════════════════════════════════
 
 
+def _gather(*calls: Callable[[], T]) -> list[T]:
+    """Run independent blocking calls concurrently; results in call order.
+
+    Workers have no Streamlit script context, so resolve anything from
+    ``st.session_state`` (e.g. the authed client) before calling this.
+    """
+    futures = [_io_pool.submit(fn) for fn in calls]
+    return [f.result() for f in futures]
+
+
+def _fetch_pages(query: Callable[[], Any], limit: int, offset: int = 0) -> list[dict]:
+    """Rows *offset* … *offset + limit - 1* of ``query()``, via ``.range()``.
+
+    PostgREST caps a single response (1000 rows on Supabase), so larger
+    windows are read ``_PAGE_SIZE`` rows at a time until a short page.
+    *query* must build a fresh, ordered request builder on each call.
+    """
+    rows: list[dict] = []
+    end = offset + limit
+    while offset < end:
+        stop = min(offset + _PAGE_SIZE, end)
+        page = query().range(offset, stop - 1).execute().data or []
+        rows.extend(page)
+        if len(page) < stop - offset:
+            break
+        offset = stop
+    return rows
+
+
+def is_missing_rpc(exc: Exception) -> bool:
+    """True when an RPC failed because its SQL function isn't installed.
+
+    PostgREST answers ``PGRST202`` when the function is not in its schema
+    cache, and Postgres raises SQLSTATE ``42883`` for an unknown signature.
+    Anything else (network, statement timeout) is treated as transient.
+    """
+    code = getattr(exc, "code", None)
+    if code in _MISSING_RPC_CODES:
+        return True
+    err = str(exc)
+    return any(c in err for c in _MISSING_RPC_CODES)
+
+
+def _is_connection_error(exc: Exception) -> bool:
+    """Dropped / reset / timed-out connection (pooler disconnect, stale keep-alive)."""
+    if _httpx_available and isinstance(exc, httpx.TransportError):
+        return True
+    msg = str(exc).lower()
+    return "connection" in msg or "reset" in msg or "eof" in msg
+
+
+def _is_unsent_error(exc: Exception) -> bool:
+    """The request never reached the server, so even an insert is safe to retry."""
+    return _httpx_available and isinstance(
+        exc, (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+    )
+
+
+def _execute_with_reconnect(
+    fn: Callable[["Client"], T],
+    *,
+    idempotent: bool = True,
+    client: "Client | None" = None,
+) -> T:
+    """Run ``fn(client)`` on the session's authed client, retrying transient errors.
+
+    Connection-class errors drop the cached client first so the retry
+    starts from a fresh one.  Backoff is ``min(cap, base * 2**attempt)``
+    plus a little jitter.  With ``idempotent=False`` only errors raised
+    before the request was sent are retried.  The last error propagates.
+
+    Pass *client* when running off the script thread (no session_state);
+    it is then reused as-is for every attempt.
+    """
+    get_client = (lambda: client) if client is not None else SupabaseManager._authed_client
+    for attempt in range(_DB_ATTEMPTS - 1):
+        try:
+            return fn(get_client())
+        except Exception as exc:
+            retryable = _is_connection_error(exc) if idempotent else _is_unsent_error(exc)
+            if not retryable:
+                raise
+            if client is None:
+                SupabaseManager.reset_client()
+            delay = min(_DB_BACKOFF_CAP, _DB_BACKOFF_BASE * 2 ** attempt) + random.random() * 0.1
+            logger.warning(
+                "Supabase connection error — retry in %.2fs (%d/%d): %s",
+                delay, attempt + 1, _DB_ATTEMPTS, exc,
+            )
+            time.sleep(delay)
+    return fn(get_client())
+
+
+def _jwt_exp(token: str) -> float:
+    """``exp`` claim of a JWT, decoded locally (no signature check); 0 if unreadable."""
+    try:
+        payload = token.split(".")[1]
+        return float(orjson.loads(base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4)))["exp"])
+    except (IndexError, KeyError, TypeError, ValueError):
+        return 0.0
+
+
+def _session_cache_get(
+    key: str, rev_key: str, ttl: float | None = None
+) -> tuple[bool, Any]:
+    """``(True, value)`` if *key* was cached at the current *rev_key* revision
+    (and, with *ttl*, less than *ttl* seconds ago)."""
+    entry = st.session_state.get(key)
+    if (
+        entry is not None
+        and entry[0] == st.session_state.get(rev_key, 0)
+        and (ttl is None or time.monotonic() - entry[2] < ttl)
+    ):
+        return True, entry[1]
+    return False, None
+
+
+def _session_cache_put(key: str, rev_key: str, value: Any) -> None:
+    st.session_state[key] = (st.session_state.get(rev_key, 0), value, time.monotonic())
+
+
+def _bump_rev(rev_key: str) -> None:
+    """Invalidate every read cached under *rev_key*."""
+    st.session_state[rev_key] = st.session_state.get(rev_key, 0) + 1
+
+
 def _user_dict(user: Any) -> dict:
     """Normalise a Supabase ``User`` object into a plain dict."""
     meta = getattr(user, "user_metadata", None) or {}
@@ -473,38 +909,90 @@ def _user_dict(user: Any) -> dict:
     }
 
 
-def _store_session(session: Any, user: Any) -> None:
-    """Persist auth tokens + user info into ``st.session_state``."""
+def _message_row(user_id: str, role: str, content: str, sources: list | None) -> dict:
+    """Build a ``chat_history`` row ready for insert."""
+    return {
+        "user_id": user_id,
+        "role": role,
+        "content": content,
+        "sources": list(sources) if sources else None,  # TEXT[] column
+    }
+
+
+def _decode_sources(value: Any) -> list | None:
+    """``sources`` as a list — only rows from before the TEXT[] column
+    (a JSON-encoded string) need decoding."""
+    if not isinstance(value, str):
+        return value
+    try:
+        return orjson.loads(value)
+    except orjson.JSONDecodeError:
+        return None
+
+
+def _store_session(session: Any, user: Any, client: "Client | None" = None) -> dict:
+    """Persist auth tokens + user info into ``st.session_state``.
+
+    *client* is the one that just signed in / refreshed; it already holds
+    the session, so it becomes the cached authed client and the first
+    query doesn't repeat ``set_session``.  Returns the stored user dict so
+    callers don't normalise *user* a second time.
+    """
+    if client is not None:
+        st.session_state[_CLIENT_KEY] = (session.access_token, client)
     st.session_state["auth_tokens"] = {
         "access_token": session.access_token,
         "refresh_token": session.refresh_token,
+        # epoch seconds; lets callers check expiry without asking GoTrue
+        "expires_at": session.expires_at or _jwt_exp(session.access_token),
     }
-    st.session_state["auth_user"] = _user_dict(user)
+    user_dict = st.session_state["auth_user"] = _user_dict(user)
     st.session_state["authenticated"] = True
+    return user_dict
+
+
+def _session_user_id() -> str | None:
+    """Id of the user signed in to this session (``None`` when anonymous)."""
+    user = st.session_state.get("auth_user")
+    return user.get("id") if user else None
 
 
 def _clear_session() -> None:
     """Wipe every auth-related key from ``session_state``."""
-    for key in ("auth_tokens", "auth_user", "authenticated"):
+    for key in ("auth_tokens", "auth_user", "authenticated", _CLIENT_KEY, _SETTINGS_KEY):
         st.session_state.pop(key, None)
 
 
+# One anchored pass over the message; alternatives are tried in priority
+# order and each is a set of lookaheads, so word order doesn't matter.
+_ERR_RE = re.compile(
+    r"""^(?:
+        (?=.*already\ registered)                 (?P<dup>)
+      | (?=.*invalid\ (?:login|credentials))      (?P<bad>)
+      | (?=.*password)(?=.*(?:short|least))       (?P<pwshort>)
+      | (?=.*email)(?=.*valid)                    (?P<email>)
+      | (?=.*(?:rate|too\ many))                  (?P<rate>)
+      | (?=.*user\ not\ found)                    (?P<nouser>)
+      | (?=.*email\ not\ confirmed)               (?P<noconfirm>)
+    )""",
+    re.IGNORECASE | re.DOTALL | re.VERBOSE,
+)
+
+_ERR_MESSAGES = {
+    "dup": "An account with this email already exists.",
+    "bad": "Invalid email or password.",
+    "pwshort": "Password must be at least 6 characters.",
+    "email": "Please enter a valid email address.",
+    "rate": "Too many attempts — please try again later.",
+    "nouser": "No account found with that email.",
+    "noconfirm": "Please confirm your email before signing in.",
+}
+
+
 def _friendly_error(exc: Exception) -> str:
     """Extract a user-friendly message from a Supabase exception."""
-    msg = str(exc).lower()
-    if "already registered" in msg:
-        return "An account with this email already exists."
-    if "invalid login" in msg or "invalid credentials" in msg:
-        return "Invalid email or password."
-    if "password" in msg and ("short" in msg or "least" in msg):
-        return "Password must be at least 6 characters."
-    if "email" in msg and "valid" in msg:
-        return "Please enter a valid email address."
-    if "rate" in msg or "too many" in msg:
-        return "Too many attempts — please try again later."
-    if "user not found" in msg:
-        return "No account found with that email."
-    if "email not confirmed" in msg:
-        return "Please confirm your email before signing in."
+    m = _ERR_RE.search(str(exc))
+    if m:
+        return _ERR_MESSAGES[m.lastgroup]
     # Generic fallback
-    return f"Something went wrong. Please try again."
+    return "Something went wrong. Please try again."
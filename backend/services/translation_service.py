@@ -17,6 +17,9 @@ Usage
 from __future__ import annotations
 
 import logging
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from functools import lru_cache
 
 from deep_translator import GoogleTranslator
@@ -25,6 +28,9 @@ from backend.config import Config
 
 logger = logging.getLogger(__name__)
 
+# Process-wide memo size — farmer queries and canned replies repeat a lot
+_TRANSLATE_CACHE_SIZE = 4096
+
 # ── Language code mapping ──────────────────────────────────────────────
 # deep-translator uses ISO 639-1 codes.  Most match Config directly.
 # Exceptions: Odia ("or" → "or"), Assamese ("as" → not always supported).
@@ -42,6 +48,48 @@ _LANG_MAP: dict[str, str] = {
     "or": "or",
     "as": "as",
 }
+_LANG_GET = _LANG_MAP.get  # bound once — used on every translate()
+
+
+# ── Script detection ───────────────────────────────────────────────────
+# The Indic Unicode blocks are consecutive 128-code-point blocks starting at
+# U+0900, so the block index is ``(cp - 0x0900) >> 7``.
+_INDIC_START = 0x0900
+_SCRIPT_LANGS: tuple[str, ...] = (
+    "hi",   # Devanagari → Hindi/Marathi
+    "bn",   # Bengali
+    "pa",   # Gurmukhi → Punjabi
+    "gu",   # Gujarati
+    "or",   # Odia
+    "ta",   # Tamil
+    "te",   # Telugu
+    "kn",   # Kannada
+    "ml",   # Malayalam
+    "si",   # Sinhala
+)
+_INDIC_RE = re.compile("[\u0900-\u0DFF]")
+
+
+# Parallel chunk translation for long texts; small cap so Google doesn't
+# start rate-limiting us
+_chunk_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="translate")
+
+# ── Translator instances ───────────────────────────────────────────────
+# One GoogleTranslator per (src, tgt) pair, per thread: ``translate()``
+# writes the text into the instance's request params, so an instance must
+# not be shared between threads.
+_local = threading.local()
+
+
+def _get_translator(src: str, tgt: str) -> GoogleTranslator:
+    """Cached ``GoogleTranslator`` for this thread and language pair."""
+    cache: dict[tuple[str, str], GoogleTranslator] | None = getattr(_local, "translators", None)
+    if cache is None:
+        cache = _local.translators = {}
+    inst = cache.get((src, tgt))
+    if inst is None:
+        inst = cache[(src, tgt)] = GoogleTranslator(source=src, target=tgt)
+    return inst
 
 
 class TranslationService:
@@ -68,8 +116,10 @@ class TranslationService:
         if source == target:
             return text
 
-        src = _LANG_MAP.get(source, source)
-        tgt = _LANG_MAP.get(target, target)
+        src = _LANG_GET(source, source)
+        tgt = _LANG_GET(target, target)
+        if src == tgt:  # aliases of the same language
+            return text
 
         try:
             result = self._do_translate(text.strip(), src, tgt)
@@ -89,76 +139,64 @@ class TranslationService:
     def detect_language(self, text: str) -> str:
         """Best-effort language detection.
 
-        Returns an ISO 639-1 code.  Falls back to ``Config.DEFAULT_LANGUAGE``
-        if detection fails.
+        Returns an ISO 639-1 code from the Unicode script of the text —
+        no network call; text without an Indic script is ``"en"``.
+        Empty text gives ``Config.DEFAULT_LANGUAGE``.
         """
         if not text or not text.strip():
             return Config.DEFAULT_LANGUAGE
-        try:
-            detected = GoogleTranslator(source="auto", target="en").translate(text)
-            # deep-translator doesn't expose detected lang; check if input ≈ output
-            if detected and detected.strip().lower() == text.strip().lower():
-                return "en"
-            # Heuristic: use Unicode block to detect script
-            return self._detect_by_script(text)
-        except Exception:
-            return Config.DEFAULT_LANGUAGE
+        return self._detect_by_script(text)
+
+    @staticmethod
+    def is_english(text: str) -> bool:
+        """True when more than 95% of *text* is ASCII — Latin script.
+
+        A cheap local check used to skip translating a query to English
+        when the user types English (or romanised Hindi/Telugu) despite
+        picking an Indic UI language.
+        """
+        if not text:
+            return True
+        return len(text.encode("ascii", "ignore")) > 0.95 * len(text)
 
     # ── internals ──────────────────────────────────────────────────────
 
     @staticmethod
+    @lru_cache(maxsize=_TRANSLATE_CACHE_SIZE)
     def _do_translate(text: str, src: str, tgt: str) -> str:
         """Call Google Translate via deep-translator.
 
-        Handles long text by chunking (Google limit ≈ 5000 chars).
+        Handles long text by chunking (Google limit ≈ 5000 chars); the
+        chunks are translated concurrently and rejoined in order.
+        Memoised per ``(text, src, tgt)``; failures are not cached.
         """
         MAX_CHUNK = 4500
         if len(text) <= MAX_CHUNK:
-            return GoogleTranslator(source=src, target=tgt).translate(text)
-
-        # Chunk by paragraphs
-        paragraphs = text.split("\n")
-        translated_parts: list[str] = []
-        chunk = ""
-        for para in paragraphs:
-            if len(chunk) + len(para) + 1 > MAX_CHUNK:
-                if chunk:
-                    translated_parts.append(
-                        GoogleTranslator(source=src, target=tgt).translate(chunk)
-                    )
-                chunk = para
-            else:
-                chunk = f"{chunk}\n{para}" if chunk else para
-        if chunk:
-            translated_parts.append(
-                GoogleTranslator(source=src, target=tgt).translate(chunk)
-            )
-        return "\n".join(translated_parts)
+            return _get_translator(src, tgt).translate(text)
+
+        # Chunk by paragraphs; *size* is the joined length of *parts*
+        chunks: list[str] = []
+        parts: list[str] = []
+        size = -1
+        for para in text.split("\n"):
+            if parts and size + 1 + len(para) > MAX_CHUNK:
+                chunks.append("\n".join(parts))
+                parts, size = [], -1
+            parts.append(para)
+            size += 1 + len(para)
+        if parts:
+            chunks.append("\n".join(parts))
+        return "\n".join(
+            _chunk_pool.map(lambda c: _get_translator(src, tgt).translate(c), chunks)
+        )
 
     @staticmethod
     def _detect_by_script(text: str) -> str:
-        """Detect language from Unicode script of the first non-ASCII char."""
-        # Unicode block ranges for Indian scripts
-        _SCRIPT_RANGES: list[tuple[int, int, str]] = [
-            (0x0900, 0x097F, "hi"),   # Devanagari → Hindi/Marathi
-            (0x0980, 0x09FF, "bn"),   # Bengali
-            (0x0A00, 0x0A7F, "pa"),   # Gurmukhi → Punjabi
-            (0x0A80, 0x0AFF, "gu"),   # Gujarati
-            (0x0B00, 0x0B7F, "or"),   # Odia
-            (0x0B80, 0x0BFF, "ta"),   # Tamil
-            (0x0C00, 0x0C7F, "te"),   # Telugu
-            (0x0C80, 0x0CFF, "kn"),   # Kannada
-            (0x0D00, 0x0D7F, "ml"),   # Malayalam
-            (0x0D80, 0x0DFF, "si"),   # Sinhala
-        ]
-        for ch in text:
-            cp = ord(ch)
-            if cp < 128:
-                continue
-            for lo, hi, lang in _SCRIPT_RANGES:
-                if lo <= cp <= hi:
-                    return lang
-        return "en"
+        """Detect language from the Unicode script of the first Indic char."""
+        m = _INDIC_RE.search(text)
+        if m is None:
+            return "en"
+        return _SCRIPT_LANGS[(ord(m.group()) - _INDIC_START) >> 7]
 
 
 # ── Module-level singleton ─────────────────────────────────────────────
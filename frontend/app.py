@@ -8,8 +8,12 @@ from __future__ import annotations
 
 import logging
 import os
+import re
 import sys
 import time
+from collections import deque
+from collections.abc import Iterable, Iterator
+from typing import TYPE_CHECKING
 
 import streamlit as st
 
@@ -19,18 +23,22 @@ if _PROJECT_ROOT not in sys.path:
     sys.path.insert(0, _PROJECT_ROOT)
 
 from backend.config import Config  # noqa: E402
-from backend.main import KrishiSaathi  # noqa: E402
-from backend.services.translation_service import translator  # noqa: E402
-from frontend.components.sidebar import render_sidebar, GREETINGS  # noqa: E402
+from frontend.components.sidebar import render_sidebar, refresh_memory_panel, GREETINGS  # noqa: E402
 from frontend.components.chat_interface import (  # noqa: E402
     inject_chat_css,
     render_message,
     render_chat_history,
+    render_sources,
+    sources_html,
 )
-from frontend.components.theme import render_page_header, icon, get_theme, get_palette  # noqa: E402
+from frontend.components.theme import render_page_header  # noqa: E402
 from frontend.components.auth import require_auth  # noqa: E402
 from backend.services.supabase_service import SupabaseManager  # noqa: E402
-from backend.services.memory_engine import get_memory_engine  # noqa: E402
+
+# The agent stack, translator and memory engine are imported where first
+# used, so the login page never loads them
+if TYPE_CHECKING:
+    from backend.main import KrishiSaathi
 
 logging.basicConfig(
     level=logging.INFO,
@@ -55,13 +63,22 @@ st.set_page_config(
 @st.cache_resource(show_spinner="Loading KrishiSaathi AI engine …")
 def get_backend() -> KrishiSaathi:
     """Initialise the backend once and cache it."""
+    from backend.main import KrishiSaathi
+
     return KrishiSaathi()
 
 
 # ── Session state defaults ─────────────────────────────────────────────
+# Messages kept per session; older ones drop off the front (the full
+# history stays in Supabase)
+_HISTORY_LIMIT = 200
+
+
 def _init_session() -> None:
-    if "messages" not in st.session_state:
-        st.session_state["messages"] = []
+    # Other components reset / reload history as a plain list
+    messages = st.session_state.get("messages")
+    if not isinstance(messages, deque):
+        st.session_state["messages"] = deque(messages or (), maxlen=_HISTORY_LIMIT)
     if "language" not in st.session_state:
         st.session_state["language"] = Config.DEFAULT_LANGUAGE
 
@@ -127,9 +144,71 @@ _UI_STRINGS: dict[str, dict[str, str]] = {
 }
 
 
+# Every language pre-merged over English, so a lookup never needs a fallback
+_UI: dict[str, dict[str, str]] = {
+    lang: {**_UI_STRINGS["en"], **strings} for lang, strings in _UI_STRINGS.items()
+}
+
+
 def _ui(lang: str, key: str) -> str:
     """Get a localised UI string, fallback to English."""
-    return _UI_STRINGS.get(lang, _UI_STRINGS["en"]).get(key, _UI_STRINGS["en"][key])
+    return _UI.get(lang, _UI["en"])[key]
+
+
+def _query_to_english(query: str, lang: str) -> str:
+    """The user's query in English for the backend.
+
+    Mostly-ASCII text is passed through as is: it is either English or
+    romanised Hindi/Telugu, which the translator can't read but the LLM
+    can.  The reply still goes out in *lang* either way.
+    """
+    from backend.services.translation_service import translator
+
+    if lang == "en" or translator.is_english(query):
+        return query
+    return translator.to_english(query, src=lang)
+
+
+# ── Streaming reply ────────────────────────────────────────────────────
+# A sentence ends at . ? ! or । followed by whitespace (not "1." list
+# markers), or at a line break — markdown structure survives per piece.
+_SENTENCE_END = re.compile(r"(?<!\d)[.?!।](?=\s)|\n")
+
+
+def _translate_piece(piece: str, lang: str) -> str:
+    """Translate *piece*, keeping its surrounding whitespace (translate strips it)."""
+    from backend.services.translation_service import translator
+
+    core = piece.strip()
+    if not core:
+        return piece
+    head = piece[: len(piece) - len(piece.lstrip())]
+    tail = piece[len(piece.rstrip()):]
+    return head + translator.from_english(core, dest=lang) + tail
+
+
+def _reply_pieces(deltas: Iterable[str], lang: str) -> Iterator[str]:
+    """Yield the reply for display, as ``st.write_stream`` consumes it.
+
+    English pieces pass straight through.  For other languages the text is
+    buffered to the last sentence boundary and each complete chunk is
+    translated before it is yielded, so the reply still appears
+    progressively.
+    """
+    if lang == "en":
+        yield from deltas
+        return
+    pending = ""
+    for delta in deltas:
+        pending += delta
+        cut = 0
+        for m in _SENTENCE_END.finditer(pending):
+            cut = m.end()
+        if cut:
+            yield _translate_piece(pending[:cut], lang)
+            pending = pending[cut:]
+    if pending:
+        yield _translate_piece(pending, lang)
 
 
 # ── Main ───────────────────────────────────────────────────────────────
@@ -143,6 +222,8 @@ def main() -> None:
 
     # ── Auth gate (shows login form & stops if not authenticated) ──────
     user = require_auth()
+    user_id = user.get("id", "local")
+    remote = SupabaseManager.is_configured() and user_id != "local"
 
     # ── Header ─────────────────────────────────────────────────────────
     render_page_header(
@@ -152,11 +233,11 @@ def main() -> None:
     )
 
     # ── Load persisted chat history for this user (first load) ─────────
-    if SupabaseManager.is_configured() and user.get("id") != "local":
+    if remote:
         if "_chat_loaded" not in st.session_state:
-            saved = SupabaseManager.load_messages(user["id"])
+            saved = SupabaseManager.load_messages(user_id)
             if saved:
-                st.session_state["messages"] = saved
+                st.session_state["messages"] = deque(saved, maxlen=_HISTORY_LIMIT)
             st.session_state["_chat_loaded"] = True
 
     # ── Welcome message (only if chat is empty) ────────────────────────
@@ -186,26 +267,27 @@ def main() -> None:
     if not query:
         return
 
+    from backend.services.memory_engine import get_memory_engine
+
     # ── Add user message ───────────────────────────────────────────────
     st.session_state["messages"].append(
         {"role": "user", "content": query, "sources": None}
     )
     render_message("user", query)
 
-    # Persist user message to Supabase
-    if SupabaseManager.is_configured() and user.get("id") != "local":
-        SupabaseManager.save_message(user["id"], "user", query)
+    # Queue user message — sent together with the assistant reply below
+    if remote:
+        SupabaseManager.save_message(user_id, "user", query, flush=False)
 
     # ── Translate user query to English if needed ──────────────────────
-    if lang != "en":
-        query_en = translator.to_english(query, src=lang)
-    else:
-        query_en = query
+    query_en = _query_to_english(query, lang)
 
     # ── Retrieve memory context for this user ──────────────────────────
+    # get_memory_engine keeps one engine per user for the whole process;
+    # it is looked up once per turn and reused for extraction below
     memory_context = ""
-    user_id = user.get("id", "local")
-    if SupabaseManager.is_configured() and user_id != "local":
+    mem_engine = None
+    if remote:
         try:
             mem_engine = get_memory_engine(user_id)
             memory_context = mem_engine.get_memory_context(query_en)
@@ -216,52 +298,47 @@ def main() -> None:
 
     # ── Get AI response ────────────────────────────────────────────────
     with st.chat_message("assistant", avatar="🌾"):
+        placeholder = st.empty()
         with st.spinner(_ui(lang, "thinking")):
             try:
                 start = time.time()
-                result = app.ask(query_en, user_id=user_id, memory_context=memory_context)
-                elapsed = time.time() - start
-                logger.info("Response in %.1fs  intent=%s", elapsed, result.get("intent", {}).get("primary_intent"))
-
-                response_text: str = result.get("response", "")
+                result = app.ask_stream(query_en, user_id=user_id, memory_context=memory_context)
                 sources: list[str] = result.get("sources", [])
 
-                # Translate response back to user's language
-                if lang != "en" and response_text:
-                    response_text = translator.from_english(response_text, dest=lang)
+                # Stream the reply (translated sentence by sentence if needed)
+                response_text = placeholder.write_stream(
+                    _reply_pieces(result["stream"], lang)
+                ).strip()
+                elapsed = time.time() - start
+                logger.info("Response in %.1fs  intent=%s", elapsed, result.get("intent", {}).get("primary_intent"))
 
             except Exception as exc:
                 logger.error("Backend error: %s", exc, exc_info=True)
                 response_text = _ui(lang, "error")
                 sources = []
+                placeholder.markdown(response_text)
 
-        # Display the response
-        st.markdown(response_text)
-        if sources:
-            p = get_palette(get_theme())
-            src_icon = icon("source", size=13, color=p["text_muted"])
-            src_str = " · ".join(f"`{s}`" for s in sources)
-            st.markdown(
-                f'<div class="ks-sources">{src_icon} {src_str}</div>',
-                unsafe_allow_html=True,
-            )
+        codes = sources_html(sources) if sources else ""
+        if codes:
+            render_sources(codes)
 
     # ── Save assistant message ─────────────────────────────────────────
     st.session_state["messages"].append(
-        {"role": "assistant", "content": response_text, "sources": sources}
+        {"role": "assistant", "content": response_text, "sources": sources, "_sources_html": codes}
     )
 
-    # Persist assistant message to Supabase
-    if SupabaseManager.is_configured() and user.get("id") != "local":
-        SupabaseManager.save_message(user["id"], "assistant", response_text, sources)
+    # Persist user + assistant messages to Supabase (one insert)
+    if remote:
+        SupabaseManager.save_message(user_id, "assistant", response_text, sources)
 
-    # ── Extract & store memories from this conversation turn ───────────
-    if SupabaseManager.is_configured() and user.get("id") != "local":
+    # ── Extract & store memories from this turn (background, not awaited)
+    if mem_engine is not None:
         try:
-            mem_engine = get_memory_engine(user["id"])
-            new_memories = mem_engine.add_from_conversation(query_en, response_text)
-            if new_memories:
-                logger.info("Stored %d new memories from this turn", len(new_memories))
+            future = mem_engine.add_from_conversation_async(query_en, response_text)
+            # The sidebar refetches once the new memories are actually stored
+            future.add_done_callback(
+                lambda f: f.result() and refresh_memory_panel(user_id)
+            )
         except Exception as exc:
             logger.warning("Memory extraction failed (non-fatal): %s", exc)
 
@@ -10,6 +10,8 @@ Usage in any page::
 
 from __future__ import annotations
 
+from functools import lru_cache
+
 import streamlit as st
 
 from backend.services.supabase_service import SupabaseManager
@@ -88,7 +90,7 @@ def render_auth_page() -> None:
 
     # Global theme + auth-specific CSS
     inject_global_css(theme)
-    _inject_auth_css(pal, theme)
+    _inject_auth_css(theme)
 
     # ── Centered column ────────────────────────────────────────────
     _spacer, col, _spacer2 = st.columns([1, 2, 1])
@@ -251,11 +253,17 @@ def _load_user_chat(user_id: str) -> None:
         st.session_state["messages"] = msgs if msgs else []
 
 
-def _inject_auth_css(pal: dict, theme: str) -> None:
+def _inject_auth_css(theme: str) -> None:
     """Theme-aware CSS for the auth page."""
+    st.markdown(_auth_css(theme), unsafe_allow_html=True)
+
+
+@lru_cache(maxsize=None)
+def _auth_css(theme: str) -> str:
+    """Auth-page ``<style>`` block for *theme*; built once per theme."""
+    pal = get_palette(theme)
     shadow = "0 8px 32px rgba(0,0,0,0.28)" if theme == "dark" else "0 4px 24px rgba(0,0,0,0.08)"
-    st.markdown(
-        f"""<style>
+    return f"""<style>
         /* ── Auth header ─────────────────────────────────────────── */
         .ks-auth-header {{
             text-align: center;
@@ -324,6 +332,4 @@ def _inject_auth_css(pal: dict, theme: str) -> None:
             border-top: none;
             box-shadow: {shadow};
         }}
-        </style>""",
-        unsafe_allow_html=True,
-    )
+        </style>"""
@@ -2,6 +2,9 @@
 
 from __future__ import annotations
 
+import html
+from functools import lru_cache
+
 import streamlit as st
 
 from frontend.components.theme import icon, get_theme, get_palette
@@ -11,8 +14,14 @@ from frontend.components.theme import icon, get_theme, get_palette
 
 def inject_chat_css() -> None:
     """Inject chat-specific CSS. Called once per page load."""
-    p = get_palette(get_theme())
-    css = f"""
+    st.markdown(_chat_css(get_theme()), unsafe_allow_html=True)
+
+
+@lru_cache(maxsize=None)
+def _chat_css(theme: str) -> str:
+    """Chat CSS for *theme*; built once per theme, then reused every rerun."""
+    p = get_palette(theme)
+    return f"""
     <style>
     /* --- Chat message overrides ---------------------------------------- */
     [data-testid="stChatMessage"] {{
@@ -36,6 +45,33 @@ def inject_chat_css() -> None:
         color: {p['text']} !important;
     }}
 
+    /* --- Pre-rendered history (same look as stChatMessage) -------------- */
+    .ks-msg {{
+        display: flex;
+        gap: 0.75rem;
+        border-radius: 16px;
+        padding: 1rem 1.2rem;
+        margin-bottom: 0.5rem;
+        background: {p['card']};
+        border: 1px solid {p['card_border']};
+        box-shadow: 0 1px 3px {p['shadow']};
+    }}
+    .ks-msg-avatar {{
+        flex-shrink: 0;
+        font-size: 1.4rem;
+        line-height: 2rem;
+    }}
+    .ks-msg-body {{
+        flex: 1;
+        min-width: 0;
+    }}
+    .ks-msg-body * {{
+        color: {p['text']};
+    }}
+    .ks-msg-body > :last-child {{
+        margin-bottom: 0;
+    }}
+
     /* --- Source citations ----------------------------------------------- */
     .ks-sources {{
         display: flex;
@@ -69,7 +105,6 @@ def inject_chat_css() -> None:
     }}
     </style>
     """
-    st.markdown(css, unsafe_allow_html=True)
 
 
 def render_message(role: str, content: str, sources: list[str] | None = None) -> None:
@@ -81,8 +116,6 @@ def render_message(role: str, content: str, sources: list[str] | None = None) ->
     content : The message text (supports Markdown).
     sources : Optional list of source labels (only for assistant messages).
     """
-    p = get_palette(get_theme())
-
     if role == "user":
         with st.chat_message("user", avatar="👨‍🌾"):
             st.markdown(content)
@@ -91,22 +124,97 @@ def render_message(role: str, content: str, sources: list[str] | None = None) ->
         with st.chat_message("assistant", avatar="🌾"):
             st.markdown(content)
             if sources:
-                src_icon = icon("source", size=13, color=p["text_muted"])
-                src_str = " · ".join(f"`{s}`" for s in sources)
-                st.markdown(
-                    f'<div class="ks-sources">{src_icon} {src_str}</div>',
-                    unsafe_allow_html=True,
-                )
+                render_sources(sources_html(sources))
+
+
+def sources_html(sources: list[str]) -> str:
+    """Source labels as the ``<code>`` list shown under a reply.
+
+    Theme-independent, so it can be built once and kept on the message
+    dict (``"_sources_html"``) for later reruns.
+    """
+    return "<code>" + "</code> · <code>".join(map(html.escape, map(str, sources))) + "</code>"
+
+
+def render_sources(codes: str) -> None:
+    """Render a :func:`sources_html` string with the source icon."""
+    src_icon = icon("source", size=13, color=get_palette(get_theme())["text_muted"])
+    st.markdown(
+        f'<div class="ks-sources">{src_icon} {codes}</div>',
+        unsafe_allow_html=True,
+    )
 
 
 def render_chat_history(messages: list[dict]) -> None:
-    """Render the full chat history from session state."""
-    for msg in messages:
-        render_message(
-            role=msg["role"],
-            content=msg["content"],
-            sources=msg.get("sources"),
-        )
+    """Render the full chat history from session state.
+
+    Runs of messages before the last one go out as one markdown element
+    styled like the chat bubbles, so a long conversation costs a few
+    elements per rerun instead of two or three per message.  Messages with
+    code (see ``_has_code``) break the run and render as normal chat
+    messages.
+    """
+    if not messages:
+        return
+    *older, last = messages
+    if older:
+        src_icon = icon("source", size=13, color=get_palette(get_theme())["text_muted"])
+        batch: list[str] = []
+        for msg in older:
+            if not _has_code(msg):
+                batch.append(_message_html(msg, src_icon))
+                continue
+            if batch:
+                st.markdown("".join(batch), unsafe_allow_html=True)
+                batch = []
+            render_message(msg["role"], msg.get("content") or "", msg.get("sources"))
+        if batch:
+            st.markdown("".join(batch), unsafe_allow_html=True)
+    render_message(
+        role=last["role"],
+        content=last["content"],
+        sources=last.get("sources"),
+    )
+
+
+_AVATARS = {"user": "👨‍🌾", "assistant": "🌾"}
+_CODE_MARKERS = ("`", "~~~")
+
+
+def _has_code(msg: dict) -> bool:
+    """True if the message has a code span or fence.
+
+    Entities aren't decoded inside code, so the ``&lt;`` escaping in
+    ``_message_html`` would show literally, and an unclosed fence (e.g. a
+    truncated reply) would swallow the rest of the batch.
+    """
+    content = msg.get("content") or ""
+    return any(m in content for m in _CODE_MARKERS)
+
+
+def _message_html(msg: dict, src_icon: str) -> str:
+    """One history bubble.
+
+    The blank lines around the content end the surrounding HTML blocks,
+    so the message body is still parsed as Markdown.  ``<`` is escaped
+    because this block is rendered with ``unsafe_allow_html``; callers
+    keep messages with code out (``_has_code``).
+    """
+    role = msg["role"]
+    parts = [
+        f'<div class="ks-msg"><div class="ks-msg-avatar">{_AVATARS.get(role, "🌾")}</div>'
+        '<div class="ks-msg-body">\n\n',
+        (msg.get("content") or "").replace("<", "&lt;"),
+        "\n\n",
+    ]
+    sources = msg.get("sources")
+    if role != "user" and sources:
+        codes = msg.get("_sources_html")
+        if codes is None:
+            codes = msg["_sources_html"] = sources_html(sources)
+        parts.append(f'<div class="ks-sources">{src_icon} {codes}</div>\n')
+    parts.append("</div></div>\n\n")
+    return "".join(parts)
 
 
 def show_typing_indicator() -> None:
@@ -3,13 +3,14 @@
 from __future__ import annotations
 
 import base64
+import itertools
 import os
+from functools import lru_cache
 
 import streamlit as st
 
 from backend.config import Config
 from backend.services.supabase_service import SupabaseManager
-from backend.services.memory_engine import get_memory_engine
 from frontend.components.theme import (
     ICON,
     icon,
@@ -36,6 +37,9 @@ LANGUAGE_LABELS: dict[str, str] = {
     "or": "ଓଡ଼ିଆ (Odia)",
     "as": "অসমীয়া (Assamese)",
 }
+LANG_CODES: tuple[str, ...] = tuple(LANGUAGE_LABELS.keys())
+LANG_LABELS: tuple[str, ...] = tuple(LANGUAGE_LABELS.values())
+LABEL_TO_CODE: dict[str, str] = {v: k for k, v in LANGUAGE_LABELS.items()}
 
 # ── Greeting per language ──────────────────────────────────────────────
 GREETINGS: dict[str, str] = {
@@ -54,30 +58,56 @@ GREETINGS: dict[str, str] = {
 }
 
 # ── Quick-action labels per language ───────────────────────────────────
-QUICK_ACTIONS: dict[str, list[tuple[str, str, str]]] = {
-    "en": [
+QUICK_ACTIONS: dict[str, tuple[tuple[str, str, str], ...]] = {
+    "en": (
         ("crop", "Crop Disease", "My crop has a disease, help me diagnose it"),
         ("rupee", "Market Prices", "What are today's mandi prices for rice?"),
         ("scheme", "Govt Schemes", "What government schemes am I eligible for?"),
         ("weather", "Weather", "What is the weather forecast for my area?"),
         ("soil", "Soil Health", "Recommend fertilizers for my red soil"),
-    ],
-    "te": [
+    ),
+    "te": (
         ("crop", "పంట వ్యాధి", "నా పంటకు వ్యాధి వచ్చింది, నిర్ధారణ చేయండి"),
         ("rupee", "మార్కెట్ ధరలు", "ఈ రోజు వరి మండి ధర ఎంత?"),
         ("scheme", "ప్రభుత్వ పథకాలు", "నాకు ఏ ప్రభుత్వ పథకాలు అర్హత ఉన్నాయి?"),
         ("weather", "వాతావరణం", "నా ప్రాంతంలో వాతావరణ సూచన ఏమిటి?"),
         ("soil", "నేల ఆరోగ్యం", "ఎర్ర నేలకు ఎరువులు సిఫార్సు చేయండి"),
-    ],
-    "hi": [
+    ),
+    "hi": (
         ("crop", "फसल रोग", "मेरी फसल में रोग लगा है, पहचान करो"),
         ("rupee", "मंडी भाव", "आज चावल का मंडी भाव क्या है?"),
         ("scheme", "सरकारी योजना", "मुझे कौन सी सरकारी योजनाएं मिल सकती हैं?"),
         ("weather", "मौसम", "मेरे क्षेत्र का मौसम कैसा रहेगा?"),
         ("soil", "मिट्टी स्वास्थ्य", "लाल मिट्टी के लिए खाद सुझाव दें"),
-    ],
+    ),
 }
 
+QA_HEADER: dict[str, str] = {
+    "en": "Quick Actions",
+    "te": "త్వరిత చర్యలు",
+    "hi": "त्वरित कार्य",
+}
+
+CLEAR_LABEL: dict[str, str] = {
+    "en": "Clear Chat",
+    "te": "చాట్ క్లియర్",
+    "hi": "चैट मिटाएं",
+}
+
+
+@lru_cache(maxsize=1)
+def _brand_html() -> str:
+    """Logo + name block at the top of the sidebar (static, built once)."""
+    logo_data = _logo_b64()
+    logo_html = f'<img src="data:image/svg+xml;base64,{logo_data}" alt="KrishiSaathi Logo">' if logo_data else ""
+    return f"""
+            <div class="ks-sidebar-brand">
+                {logo_html}
+                <h2>KrishiSaathi</h2>
+                <p>AI Agricultural Advisory System</p>
+            </div>
+            """
+
 
 def render_sidebar() -> str:
     """Render the sidebar and return the selected language code."""
@@ -94,19 +124,7 @@ def render_sidebar() -> str:
         inject_global_css(theme)
 
         # ── Logo & Branding ────────────────────────────────────────────
-        logo_data = _logo_b64()
-        logo_html = f'<img src="data:image/svg+xml;base64,{logo_data}" alt="KrishiSaathi Logo">' if logo_data else ""
-
-        st.markdown(
-            f"""
-            <div class="ks-sidebar-brand">
-                {logo_html}
-                <h2>KrishiSaathi</h2>
-                <p>AI Agricultural Advisory System</p>
-            </div>
-            """,
-            unsafe_allow_html=True,
-        )
+        st.markdown(_brand_html(), unsafe_allow_html=True)
 
         st.divider()
 
@@ -117,23 +135,23 @@ def render_sidebar() -> str:
 
         tcol1, tcol2 = st.columns([1, 1])
         with tcol1:
-            if st.button(
+            st.button(
                 "☀️ Light" if theme == "dark" else "☀️ Light",
                 key="theme_light",
                 use_container_width=True,
                 disabled=(theme == "light"),
-            ):
-                set_theme("light")
-                st.rerun()
+                on_click=set_theme,
+                args=("light",),
+            )
         with tcol2:
-            if st.button(
+            st.button(
                 "🌙 Dark" if theme == "light" else "🌙 Dark",
                 key="theme_dark",
                 use_container_width=True,
                 disabled=(theme == "dark"),
-            ):
-                set_theme("dark")
-                st.rerun()
+                on_click=set_theme,
+                args=("dark",),
+            )
 
         st.divider()
 
@@ -162,11 +180,7 @@ def render_sidebar() -> str:
                 unsafe_allow_html=True,
             )
 
-            if st.button("🚪 Sign Out", use_container_width=True, key="btn_logout"):
-                SupabaseManager.sign_out()
-                st.session_state["messages"] = []
-                st.session_state.pop("_chat_loaded", None)
-                st.rerun()
+            st.button("🚪 Sign Out", use_container_width=True, key="btn_logout", on_click=_sign_out)
 
             # ── Admin badge ────────────────────────────────────────────
             if is_admin():
@@ -189,30 +203,20 @@ def render_sidebar() -> str:
             unsafe_allow_html=True,
         )
 
-        lang_codes = list(LANGUAGE_LABELS.keys())
-        lang_labels = list(LANGUAGE_LABELS.values())
-
         current_lang = st.session_state.get("language", Config.DEFAULT_LANGUAGE)
         try:
-            current_idx = lang_codes.index(current_lang)
+            current_idx = LANG_CODES.index(current_lang)
         except ValueError:
             current_idx = 0
 
-        selected_label = st.selectbox(
+        st.selectbox(
             "Choose your language",
-            options=lang_labels,
+            options=LANG_LABELS,
             index=current_idx,
             key="lang_selector",
             label_visibility="collapsed",
+            on_change=_lang_changed,
         )
-        selected_code = lang_codes[lang_labels.index(selected_label)]
-
-        if selected_code != st.session_state.get("language"):
-            st.session_state["language"] = selected_code
-            st.session_state["lang_changed"] = True
-            st.rerun()
-        else:
-            st.session_state["lang_changed"] = False
 
         st.divider()
 
@@ -220,11 +224,7 @@ def render_sidebar() -> str:
         lang = st.session_state.get("language", "en")
         actions = QUICK_ACTIONS.get(lang, QUICK_ACTIONS["en"])
 
-        qa_header = {
-            "en": "Quick Actions",
-            "te": "త్వరిత చర్యలు",
-            "hi": "त्वरित कार्य",
-        }.get(lang, "Quick Actions")
+        qa_header = QA_HEADER.get(lang, "Quick Actions")
 
         zap_icon = icon("zap", size=18, color=p["accent"])
         st.markdown(
@@ -233,8 +233,7 @@ def render_sidebar() -> str:
             unsafe_allow_html=True,
         )
 
-        for icon_name, label, query in actions:
-            ic = icon(icon_name, size=16, color=p["primary"])
+        for _icon_name, label, query in actions:
             if st.button(f"{label}", key=f"qa_{label}", use_container_width=True):
                 st.session_state["pending_query"] = query
 
@@ -246,20 +245,17 @@ def render_sidebar() -> str:
             st.divider()
 
         # ── Chat controls ──────────────────────────────────────────────
-        clear_label = {
-            "en": "Clear Chat",
-            "te": "చాట్ క్లియర్",
-            "hi": "चैट मिटाएं",
-        }.get(lang, "Clear Chat")
-
-        if st.button(f"🗑️ {clear_label}", use_container_width=True, key="btn_clear"):
-            st.session_state["messages"] = []
-            st.session_state.pop("pending_query", None)
-            st.session_state.pop("_chat_loaded", None)
-            # Also clear from Supabase if authenticated
-            if SupabaseManager.is_configured() and _is_authed and _user:
-                SupabaseManager.clear_messages(_user["id"])
-            st.rerun()
+        clear_label = CLEAR_LABEL.get(lang, "Clear Chat")
+
+        # Also clear from Supabase if authenticated
+        remote_id = _user["id"] if SupabaseManager.is_configured() and _is_authed and _user else None
+        st.button(
+            f"🗑️ {clear_label}",
+            use_container_width=True,
+            key="btn_clear",
+            on_click=_clear_chat,
+            args=(remote_id,),
+        )
 
         # ── Footer ─────────────────────────────────────────────────────
         st.divider()
@@ -278,6 +274,46 @@ def render_sidebar() -> str:
     return st.session_state.get("language", Config.DEFAULT_LANGUAGE)
 
 
+# ── Widget callbacks ───────────────────────────────────────────────────
+# State changes run before the rerun Streamlit already does for the
+# click, instead of an extra st.rerun() after it
+
+def _sign_out() -> None:
+    SupabaseManager.sign_out()
+    st.session_state["messages"] = []
+    st.session_state.pop("_chat_loaded", None)
+
+
+def _lang_changed() -> None:
+    st.session_state["language"] = LABEL_TO_CODE[st.session_state["lang_selector"]]
+
+
+def _clear_chat(user_id: str | None) -> None:
+    st.session_state["messages"] = []
+    st.session_state.pop("pending_query", None)
+    st.session_state.pop("_chat_loaded", None)
+    if user_id:
+        SupabaseManager.clear_messages(user_id)
+
+
+def _delete_memory(user_id: str, memory_id: int) -> None:
+    from backend.services.memory_engine import get_memory_engine
+
+    get_memory_engine(user_id).delete(memory_id)
+    refresh_memory_panel(user_id)
+
+
+def _clear_memories(user_id: str) -> None:
+    from backend.services.memory_engine import get_memory_engine
+
+    try:
+        get_memory_engine(user_id).clear_all()
+        refresh_memory_panel(user_id)
+        st.toast("All memories cleared!", icon="🧹")
+    except Exception:
+        st.error("Failed to clear memories.")
+
+
 # ═══════════════════════════════════════════════════════════════════════
 #  Memory Panel — shows memory stats & management
 # ═══════════════════════════════════════════════════════════════════════
@@ -302,6 +338,32 @@ MEMORY_LABELS: dict[str, dict[str, str]] = {
 }
 
 
+# Per-user snapshot revision; a new value makes the next rerun refetch.
+# ``next()`` on a shared counter is atomic, so background threads can bump it.
+_memory_revs: dict[str, int] = {}
+_rev_counter = itertools.count(1)
+
+
+@st.cache_data(ttl=30, show_spinner=False)
+def _memory_snapshot(user_id: str, rev: int) -> tuple[dict, list[dict]]:
+    """Memory stats + the newest 30 memories, reused across sidebar reruns
+    until *rev* changes."""
+    # numpy + the memory engine load only once a signed-in user sees this
+    from backend.services.memory_engine import get_memory_engine
+
+    mem_engine = get_memory_engine(user_id)
+    return mem_engine.stats(), mem_engine.get_all(limit=30)
+
+
+def refresh_memory_panel(user_id: str) -> None:
+    """Make the next rerun refetch *user_id*'s memories.
+
+    Safe to call from any thread (e.g. a background extraction's
+    completion callback) — it only bumps the snapshot revision.
+    """
+    _memory_revs[user_id] = next(_rev_counter)
+
+
 def _render_memory_panel(user: dict, lang: str, p: dict) -> None:
     """Render the memory management panel in the sidebar."""
     labels = MEMORY_LABELS.get(lang, MEMORY_LABELS["en"])
@@ -317,13 +379,13 @@ def _render_memory_panel(user: dict, lang: str, p: dict) -> None:
     )
 
     try:
-        mem_engine = get_memory_engine(user_id)
-        stats = mem_engine.stats()
+        stats, memories = _memory_snapshot(user_id, _memory_revs.get(user_id, 0))
         total = stats.get("total", 0)
         cats = stats.get("categories", {})
     except Exception:
         total = 0
         cats = {}
+        memories = []
 
     if total == 0:
         st.caption(labels["empty"])
@@ -350,7 +412,6 @@ def _render_memory_panel(user: dict, lang: str, p: dict) -> None:
     # Expandable: View Memories
     with st.expander("🔍 View Memories", expanded=False):
         try:
-            memories = mem_engine.get_all(limit=30)
             for m in memories:
                 cat = m.get("category", "")
                 emoji = CATEGORY_ICONS.get(cat, "📌")
@@ -370,18 +431,21 @@ def _render_memory_panel(user: dict, lang: str, p: dict) -> None:
                         unsafe_allow_html=True,
                     )
                 with col2:
-                    if st.button("🗑", key=f"del_mem_{mid}", help="Delete this memory"):
-                        mem_engine.delete(mid)
-                        st.rerun()
+                    st.button(
+                        "🗑",
+                        key=f"del_mem_{mid}",
+                        help="Delete this memory",
+                        on_click=_delete_memory,
+                        args=(user_id, mid),
+                    )
         except Exception:
             st.caption("Could not load memories.")
 
     # Clear all memories button
-    if st.button(f"🧹 {labels['clear']}", use_container_width=True, key="btn_clear_memories"):
-        try:
-            mem_engine = get_memory_engine(user_id)
-            mem_engine.clear_all()
-            st.toast("All memories cleared!", icon="🧹")
-            st.rerun()
-        except Exception:
-            st.error("Failed to clear memories.")
+    st.button(
+        f"🧹 {labels['clear']}",
+        use_container_width=True,
+        key="btn_clear_memories",
+        on_click=_clear_memories,
+        args=(user_id,),
+    )
@@ -11,6 +11,7 @@ from __future__ import annotations
 
 import base64
 import os
+from functools import lru_cache
 from typing import Literal
 
 import streamlit as st
@@ -148,8 +149,9 @@ def icon(name: str, size: int | None = None, color: str | None = None) -> str:
 
 # ── Logo helper ────────────────────────────────────────────────────────
 
+@lru_cache(maxsize=1)
 def _logo_b64() -> str:
-    """Return the logo.svg as base64 data URI."""
+    """Return the logo.svg as base64 data URI (read once per process)."""
     path = os.path.join(_ASSETS, "logo.svg")
     if os.path.exists(path):
         with open(path, "rb") as f:
@@ -161,9 +163,13 @@ def _logo_b64() -> str:
 
 def inject_global_css(theme: str = "light") -> None:
     """Inject the full-page CSS for the selected theme."""
-    p = get_palette(theme)
-    css = _build_css(p, theme)
-    st.markdown(f"<style>{css}</style>", unsafe_allow_html=True)
+    st.markdown(_global_css(theme), unsafe_allow_html=True)
+
+
+@lru_cache(maxsize=None)
+def _global_css(theme: str) -> str:
+    """``<style>`` block for *theme*; built once per theme."""
+    return f"<style>{_build_css(get_palette(theme), theme)}</style>"
 
 
 def _build_css(p: dict[str, str], theme: str) -> str:
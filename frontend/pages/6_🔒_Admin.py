@@ -58,30 +58,42 @@ _TABS = [
 # ═══════════════════════════════════════════════════════════════════════
 
 @st.cache_data(ttl=300, show_spinner=False)
-def _load_counts() -> dict:
-    return SupabaseManager.admin_get_counts()
+def _load_counts(_client) -> dict:
+    return SupabaseManager.admin_get_counts(client=_client)
 
 
 @st.cache_data(ttl=300, show_spinner=False)
-def _load_users() -> list[dict]:
-    return SupabaseManager.admin_list_users()
+def _load_users(_client) -> list[dict]:
+    return SupabaseManager.admin_list_users(client=_client)
 
 
 @st.cache_data(ttl=300, show_spinner=False)
-def _load_messages() -> list[dict]:
-    return SupabaseManager.admin_get_all_chat_history(limit=2000)
+def _load_messages(_client) -> list[dict]:
+    return SupabaseManager.admin_get_all_chat_history(limit=2000, client=_client)
 
 
 @st.cache_data(ttl=300, show_spinner=False)
-def _load_memories() -> list[dict]:
-    return SupabaseManager.admin_get_all_memories(limit=2000)
+def _load_memories(_client) -> list[dict]:
+    return SupabaseManager.admin_get_all_memories(limit=2000, client=_client)
+
+
+_LOADERS = {
+    "counts": _load_counts,
+    "users": _load_users,
+    "messages": _load_messages,
+    "memories": _load_memories,
+}
+
+
+def _load(*parts: str) -> tuple:
+    """Datasets for one section — each cached on its own, misses fetched
+    concurrently."""
+    return tuple(SupabaseManager.admin_fetch(*(_LOADERS[p] for p in parts)))
 
 
 def _clear_all_caches() -> None:
-    _load_counts.clear()
-    _load_users.clear()
-    _load_messages.clear()
-    _load_memories.clear()
+    for loader in _LOADERS.values():
+        loader.clear()
 
 
 # ═══════════════════════════════════════════════════════════════════════
@@ -142,8 +154,7 @@ def _build_msg_stats(msgs: list[dict]) -> tuple[Counter, Counter, Counter, dict]
 
 def _render_overview() -> None:
     with st.spinner("Loading metrics…"):
-        counts = _load_counts()
-        users = _load_users()
+        counts, users = _load("counts", "users")
 
     st.subheader("Key Metrics")
     m1, m2, m3, m4, m5 = st.columns(5)
@@ -157,8 +168,7 @@ def _render_overview() -> None:
 
     # Detailed analytics (heavier load — cached after first call)
     with st.spinner("Loading analytics…"):
-        all_msgs = _load_messages()
-        all_mems = _load_memories()
+        all_msgs, all_mems = _load("messages", "memories")
 
     user_msg_counts, daily, roles, last_active = _build_msg_stats(all_msgs)
 
@@ -229,9 +239,7 @@ def _render_users() -> None:
     p = get_palette(get_theme())
 
     with st.spinner("Loading users…"):
-        users = _load_users()
-        all_msgs = _load_messages()
-        all_mems = _load_memories()
+        users, all_msgs, all_mems = _load("users", "messages", "memories")
 
     user_msg_counts, _daily, _roles, last_active = _build_msg_stats(all_msgs)
     user_mem_counts: Counter = Counter()
@@ -334,8 +342,7 @@ def _render_chats() -> None:
     p = get_palette(get_theme())
 
     with st.spinner("Loading chat logs…"):
-        all_msgs = _load_messages()
-        users = _load_users()
+        all_msgs, users = _load("messages", "users")
 
     user_map = {u["id"]: u for u in users}
     user_msg_counts, *_ = _build_msg_stats(all_msgs)
@@ -403,8 +410,7 @@ def _render_chats() -> None:
 
 def _render_memories() -> None:
     with st.spinner("Loading memories…"):
-        all_mems = _load_memories()
-        users = _load_users()
+        all_mems, users = _load("memories", "users")
 
     user_map = {u["id"]: u for u in users}
     user_mem_counts: Counter = Counter()
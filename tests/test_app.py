@@ -0,0 +1,62 @@
+"""Tests for the chat page helpers."""
+
+from __future__ import annotations
+
+import pytest
+
+from backend.services.translation_service import translator
+from frontend.app import _query_to_english, _reply_pieces
+
+
+@pytest.fixture
+def upper_translator(monkeypatch):
+    calls: list[str] = []
+
+    def from_english(text: str, dest: str) -> str:
+        calls.append(text)
+        return text.upper()
+
+    monkeypatch.setattr(translator, "from_english", from_english)
+    return calls
+
+
+def test_english_passes_through_untouched(upper_translator):
+    deltas = ["Hello wor", "ld. How", " are you?"]
+    assert list(_reply_pieces(deltas, "en")) == deltas
+    assert upper_translator == []
+
+
+def test_translates_complete_sentences_as_they_arrive(upper_translator):
+    pieces = list(_reply_pieces(["Hello wor", "ld. How a", "re you? Fine"], "hi"))
+    assert pieces == ["HELLO WORLD.", " HOW ARE YOU?", " FINE"]
+    # Surrounding whitespace is kept outside the translated text
+    assert upper_translator == ["Hello world.", "How are you?", "Fine"]
+
+
+def test_newline_ends_a_piece(upper_translator):
+    pieces = list(_reply_pieces(["- rice\n- wheat\n", "- maize"], "te"))
+    assert pieces == ["- RICE\n- WHEAT\n", "- MAIZE"]
+
+
+def test_numbers_do_not_end_a_sentence(upper_translator):
+    pieces = list(_reply_pieces(["Step 1. Apply 2.5 kg urea. Then water"], "hi"))
+    assert pieces == ["STEP 1. APPLY 2.5 KG UREA.", " THEN WATER"]
+
+
+def test_whitespace_only_piece_is_not_translated(upper_translator):
+    assert list(_reply_pieces(["Done.\n", "\n"], "hi")) == ["DONE.\n", "\n"]
+    assert upper_translator == ["Done."]
+
+
+@pytest.mark.parametrize("query", ["When should I sow wheat?", "mera gehun kab boyein"])
+def test_latin_script_query_is_not_translated(monkeypatch, query):
+    def to_english(text: str, src: str) -> str:
+        raise AssertionError("ASCII queries skip to_english")
+
+    monkeypatch.setattr(translator, "to_english", to_english)
+    assert _query_to_english(query, "hi") == query
+
+
+def test_indic_query_is_translated(monkeypatch):
+    monkeypatch.setattr(translator, "to_english", lambda text, src: f"{src}:{text}")
+    assert _query_to_english("गेहूं कब बोएं", "hi") == "hi:गेहूं कब बोएं"
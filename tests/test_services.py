@@ -1 +1,582 @@
 """Tests for services."""
+
+from __future__ import annotations
+
+import base64
+import math
+import random
+import threading
+import time
+from types import SimpleNamespace
+
+import numpy as np
+import orjson
+import pytest
+
+from backend.config import Config
+from backend.services import llm_helper, memory_engine, supabase_service, translation_service
+from backend.services.llm_helper import LLMHelper, _ModelState
+from backend.services.memory_engine import EMBEDDING_DIM, MemoryEngine
+from backend.services.rate_limit import TokenBucket, is_quota_error
+from backend.services.supabase_service import (
+    SupabaseManager,
+    _decode_sources,
+    _friendly_error,
+    _jwt_exp,
+)
+from backend.services.translation_service import TranslationService
+
+
+# ═══════════════════════════════════════════════════════════════════════
+#  rate_limit
+# ═══════════════════════════════════════════════════════════════════════
+
+def test_token_bucket_starts_full_and_counts():
+    bucket = TokenBucket(rpm=2, tpm=100)
+    with bucket.acquire(est_tokens=30):
+        pass
+    with bucket.acquire(est_tokens=30):
+        pass
+    assert bucket._requests < 1
+    assert bucket._tokens == pytest.approx(40, abs=1)
+    assert bucket.stats()["acquired"] == 2
+
+
+def test_token_bucket_refills_with_elapsed_time():
+    bucket = TokenBucket(rpm=2)
+    for _ in range(2):
+        with bucket.acquire():
+            pass
+    # Half a minute at 2 RPM is worth one request
+    bucket._updated -= 30
+    start = time.monotonic()
+    with bucket.acquire():
+        pass
+    assert time.monotonic() - start < 0.5
+
+
+def test_token_bucket_never_exceeds_capacity():
+    bucket = TokenBucket(rpm=5, tpm=50)
+    bucket._refill(bucket._updated + 3600)
+    assert bucket._requests == 5
+    assert bucket._tokens == 50
+
+
+def test_token_bucket_disabled_when_rpm_zero():
+    bucket = TokenBucket(rpm=0)
+    for _ in range(100):
+        with bucket.acquire(est_tokens=10**6):
+            pass
+    assert bucket.stats()["acquired"] == 0
+
+
+class ResourceExhausted(Exception):
+    pass
+
+
+@pytest.mark.parametrize(
+    ("exc", "expected"),
+    [
+        (ResourceExhausted("quota"), True),
+        (Exception("429 Too Many Requests"), True),
+        (Exception("503 The service is currently unavailable"), True),
+        (Exception("504 Deadline Exceeded"), True),
+        (ValueError("400 invalid argument"), False),
+    ],
+)
+def test_is_quota_error(exc, expected):
+    assert is_quota_error(exc) is expected
+
+
+# ═══════════════════════════════════════════════════════════════════════
+#  llm_helper — retries
+# ═══════════════════════════════════════════════════════════════════════
+
+class _FakeBackend:
+    name = "groq"
+    label = "Groq"
+    default_model = "m"
+
+    def __init__(self, *outcomes) -> None:
+        self.outcomes = list(outcomes)
+        self.calls = 0
+
+    def call(self, state, prompt, timeout, system, schema):
+        self.calls += 1
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    @staticmethod
+    def is_rate_limit(err: str) -> bool:
+        return "429" in err
+
+
+@pytest.fixture
+def helper(monkeypatch):
+    h = LLMHelper()
+    monkeypatch.setattr(h, "_max_retries", 3)
+    monkeypatch.setattr(h, "_base_delay", 0)
+    return h
+
+
+def _retry(helper, backend):
+    return helper._call_with_retries(backend, _ModelState(name="m", backend="groq"), "p", "agent")
+
+
+def test_server_error_is_retried(helper):
+    backend = _FakeBackend(Exception("503 overloaded"), Exception("429 slow down"), "ok")
+    assert _retry(helper, backend) == "ok"
+    assert backend.calls == 3
+
+
+@pytest.mark.parametrize(
+    "exc",
+    [Exception("504 Deadline Exceeded"), TimeoutError("read timed out")],
+)
+def test_timeout_goes_to_next_model_without_retry(helper, exc):
+    backend = _FakeBackend(exc, "never")
+    with pytest.raises(type(exc)):
+        _retry(helper, backend)
+    assert backend.calls == 1
+
+
+def test_retries_stop_at_the_limit(helper):
+    backend = _FakeBackend(*(Exception("500 internal") for _ in range(3)))
+    with pytest.raises(Exception, match="500"):
+        _retry(helper, backend)
+    assert backend.calls == 3
+
+
+# ═══════════════════════════════════════════════════════════════════════
+#  llm_helper — in-flight dedup
+# ═══════════════════════════════════════════════════════════════════════
+
+def test_concurrent_identical_prompts_share_one_call(helper, monkeypatch):
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def dispatch(*args):
+        calls.append(args)
+        started.set()
+        release.wait(5)
+        return "answer"
+
+    monkeypatch.setattr(helper, "_dispatch", dispatch)
+    results = []
+    owner = threading.Thread(target=lambda: results.append(helper.generate("same")))
+    owner.start()
+    started.wait(5)
+    joiner = threading.Thread(target=lambda: results.append(helper.generate("same")))
+    joiner.start()
+    joiner.join(0.2)
+    assert joiner.is_alive()  # waiting on the owner's call, not its own
+    release.set()
+    owner.join(5)
+    joiner.join(5)
+
+    assert results == ["answer", "answer"]
+    assert len(calls) == 1
+
+
+def test_failure_is_not_remembered(helper, monkeypatch):
+    outcomes = [RuntimeError("503 overloaded"), "answer"]
+
+    def dispatch(*args):
+        outcome = outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    monkeypatch.setattr(helper, "_dispatch", dispatch)
+    with pytest.raises(RuntimeError):
+        helper.generate("retry me")
+    assert helper.generate("retry me") == "answer"
+    assert not helper._inflight
+
+
+# ═══════════════════════════════════════════════════════════════════════
+#  supabase_service helpers
+# ═══════════════════════════════════════════════════════════════════════
+
+def _jwt(payload: dict) -> str:
+    body = base64.urlsafe_b64encode(orjson.dumps(payload)).rstrip(b"=").decode()
+    return f"header.{body}.signature"
+
+
+def test_jwt_exp_reads_unpadded_payload():
+    assert _jwt_exp(_jwt({"exp": 1760000000, "sub": "u"})) == 1760000000.0
+
+
+@pytest.mark.parametrize("token", ["", "not-a-jwt", _jwt({"sub": "u"}), "a.%%%.c"])
+def test_jwt_exp_unreadable_is_zero(token):
+    assert _jwt_exp(token) == 0.0
+
+
+@pytest.mark.parametrize(
+    ("message", "expected"),
+    [
+        ("User already registered", "An account with this email already exists."),
+        ("Invalid login credentials", "Invalid email or password."),
+        ("Password should be at least 6 characters", "Password must be at least 6 characters."),
+        ("Unable to validate email address: invalid format", "Please enter a valid email address."),
+        ("Too many requests", "Too many attempts — please try again later."),
+        ("Email not confirmed", "Please confirm your email before signing in."),
+        ("connection reset", "Something went wrong. Please try again."),
+        # Earlier alternatives win when several match
+        ("User already registered (rate limited)", "An account with this email already exists."),
+        ("Invalid login: email is not valid", "Invalid email or password."),
+    ],
+)
+def test_friendly_error_priority(message, expected):
+    assert _friendly_error(Exception(message)) == expected
+
+
+@pytest.mark.parametrize(
+    ("value", "expected"),
+    [
+        (["a", "b"], ["a", "b"]),
+        (None, None),
+        ('["Weather", "Market"]', ["Weather", "Market"]),
+        ("not json", None),
+    ],
+)
+def test_decode_sources(value, expected):
+    assert _decode_sources(value) == expected
+
+
+# ═══════════════════════════════════════════════════════════════════════
+#  supabase_service — admin settings cache
+# ═══════════════════════════════════════════════════════════════════════
+
+@pytest.fixture
+def settings_table(monkeypatch):
+    """A fake admin_settings row that only the ``admin`` user can read (RLS)."""
+    session = SimpleNamespace(session_state={})
+    table = {"reads": 0, "row": {"llm_temperature": 0.2}}
+
+    def fetch():
+        table["reads"] += 1
+        user = session.session_state.get("auth_user")
+        return dict(table["row"]) if user and user["id"] == "admin" else None
+
+    monkeypatch.setattr(supabase_service, "st", session)
+    monkeypatch.setattr(SupabaseManager, "is_configured", classmethod(lambda cls: True))
+    monkeypatch.setattr(SupabaseManager, "_fetch_admin_settings", classmethod(lambda cls: fetch()))
+    return session.session_state, table
+
+
+def test_admin_settings_miss_is_not_cached(settings_table):
+    state, table = settings_table
+    assert SupabaseManager.load_admin_settings() is None
+    state["auth_user"] = {"id": "admin"}
+    assert SupabaseManager.load_admin_settings() == {"llm_temperature": 0.2}
+    assert table["reads"] == 2
+
+
+def test_admin_settings_cache_is_keyed_by_user(settings_table):
+    state, table = settings_table
+    state["auth_user"] = {"id": "admin"}
+    SupabaseManager.load_admin_settings()
+    SupabaseManager.load_admin_settings()
+    assert table["reads"] == 1
+    # a different user on the same session must not see the admin's row
+    state["auth_user"] = {"id": "farmer"}
+    assert SupabaseManager.load_admin_settings() is None
+
+
+# ═══════════════════════════════════════════════════════════════════════
+#  memory_engine — dedup banding
+# ═══════════════════════════════════════════════════════════════════════
+
+def _vec(cos: float) -> list[float]:
+    """Unit vector with cosine *cos* to the first axis."""
+    v = [0.0] * EMBEDDING_DIM
+    v[0], v[1] = cos, math.sqrt(1 - cos * cos)
+    return v
+
+
+class _FakeLLM:
+    def __init__(self, reply: str) -> None:
+        self.reply = reply
+        self.calls = 0
+
+    def generate(self, *args, **kwargs) -> str:
+        self.calls += 1
+        return self.reply
+
+
+@pytest.fixture
+def fake_llm(monkeypatch):
+    def install(reply: str = '{"action": "new"}') -> _FakeLLM:
+        fake = _FakeLLM(reply)
+        monkeypatch.setattr(llm_helper, "_instance", fake)
+        return fake
+    return install
+
+
+def _decide(facts, embs, existing_embs=()):
+    engine = MemoryEngine("user")
+    existing = [
+        {"id": 7 + i, "content": f"known {i}", "category": "crops"}
+        for i in range(len(existing_embs))
+    ]
+    ex_mat = (
+        MemoryEngine._stack_embeddings(list(existing_embs))
+        if existing_embs
+        else np.zeros((0, EMBEDDING_DIM), dtype=np.float32)
+    )
+    return engine._deduplicate_batch(facts, embs, existing, ex_mat, [[] for _ in facts])
+
+
+def test_dedup_high_similarity_is_duplicate_without_llm(fake_llm):
+    llm = fake_llm()
+    decisions = _decide(["grows rice"], [_vec(0.95)], [_vec(1.0)])
+    assert decisions == [{"action": "duplicate", "update_id": "7"}]
+    assert llm.calls == 0
+
+
+def test_dedup_below_low_band_is_new_without_llm(fake_llm):
+    llm = fake_llm()
+    decisions = _decide(["owns a tractor"], [_vec(0.5)], [_vec(1.0)])
+    assert decisions == [{"action": "new"}]
+    assert llm.calls == 0
+
+
+def test_dedup_ambiguous_band_asks_llm(fake_llm):
+    llm = fake_llm('{"action": "update", "update_id": "7", "merged_fact": "grows basmati rice"}')
+    decisions = _decide(["grows basmati"], [_vec(0.84)], [_vec(1.0)])
+    assert decisions[0]["action"] == "update"
+    assert decisions[0]["update_id"] == "7"
+    assert llm.calls == 1
+
+
+def test_dedup_ignores_unknown_llm_target(fake_llm):
+    fake_llm('{"action": "update", "update_id": "abc", "merged_fact": "x"}')
+    assert _decide(["grows basmati"], [_vec(0.84)], [_vec(1.0)]) == [{"action": "new"}]
+
+
+def test_dedup_within_one_turn(fake_llm):
+    llm = fake_llm()
+    decisions = _decide(
+        ["grows rice", "grows rice", "grows paddy"],
+        [_vec(1.0), _vec(1.0), _vec(0.84)],
+    )
+    # The repeat matches the fact queued earlier this turn; the near miss
+    # has only an unsaved (id-less) candidate, so it is new without the LLM
+    assert decisions == [{"action": "new"}, {"action": "duplicate"}, {"action": "new"}]
+    assert llm.calls == 0
+
+
+# ═══════════════════════════════════════════════════════════════════════
+#  memory_engine — embedding backfill
+# ═══════════════════════════════════════════════════════════════════════
+
+class _FakeQuery:
+    """Just enough of a PostgREST query builder over an in-memory table."""
+
+    def __init__(self, rows: list[dict], patch: dict | None = None) -> None:
+        self.rows, self.patch, self.filters = rows, patch, {}
+
+    def select(self, *args):
+        return self
+
+    def eq(self, column, value):
+        self.filters[column] = value
+        return self
+
+    def execute(self):
+        hits = [r for r in self.rows if all(r.get(c) == v for c, v in self.filters.items())]
+        if self.patch is not None:
+            for row in hits:
+                row.update(self.patch)
+        return SimpleNamespace(data=[dict(r) for r in hits])
+
+
+class _FakeClient:
+    def __init__(self, rows: list[dict]) -> None:
+        self.rows = rows
+
+    def table(self, name):
+        return SimpleNamespace(
+            select=_FakeQuery(self.rows).select,
+            update=lambda patch: _FakeQuery(self.rows, patch),
+        )
+
+
+@pytest.fixture
+def memory_table(monkeypatch):
+    """An engine for user ``u`` over a fake ``memories`` table."""
+    monkeypatch.setattr(memory_engine, "_genai_ok", True)
+    monkeypatch.setattr(Config, "GEMINI_API_KEY", "key", raising=False)
+
+    def install(rows: list[dict]) -> MemoryEngine:
+        engine = MemoryEngine("u")
+        client = _FakeClient(rows)
+        monkeypatch.setattr(engine, "_get_client", lambda: client)
+        monkeypatch.setattr(engine, "_embed_batch", lambda texts: [_vec(1.0) for _ in texts])
+        return engine
+    return install
+
+
+def test_backfill_reembeds_missing_and_wrongly_sized_vectors(memory_table):
+    old = orjson.dumps([0.1] * 3072).decode()
+    rows = [
+        {"id": 1, "user_id": "u", "content": "a", "embedding": old},
+        {"id": 2, "user_id": "u", "content": "b", "embedding": None},
+        {"id": 3, "user_id": "u", "content": "c", "embedding": _vec(0.5)},
+        {"id": 4, "user_id": "v", "content": "d", "embedding": None},
+    ]
+    engine = memory_table(rows)
+    assert engine._backfill_embeddings() == 2
+    assert engine._backfilled
+    sizes = [MemoryEngine._embedding_size(r["embedding"]) for r in rows]
+    assert sizes == [EMBEDDING_DIM, EMBEDDING_DIM, EMBEDDING_DIM, 0]
+
+
+# ═══════════════════════════════════════════════════════════════════════
+#  memory_engine — local-search cache under background writes
+# ═══════════════════════════════════════════════════════════════════════
+
+def _memory_rows(n: int) -> list[dict]:
+    return [
+        {
+            "id": i, "user_id": "u", "content": f"fact {i}", "category": "crops",
+            "importance": 5, "access_count": 0, "embedding": _vec(i / n),
+            "created_at": "2026-01-01T00:00:00+00:00",
+        }
+        for i in range(n)
+    ]
+
+
+def test_local_search_survives_concurrent_invalidation(memory_table):
+    engine = memory_table(_memory_rows(50))
+    client = engine._get_client()
+    stop = threading.Event()
+
+    def writer():
+        while not stop.is_set():
+            engine._invalidate_embeddings()
+
+    thread = threading.Thread(target=writer)
+    thread.start()
+    try:
+        for _ in range(200):
+            hits = engine._search_local(client, _vec(1.0), 3)
+            assert [h["content"] for h in hits] == [f"fact {h['id']}" for h in hits]
+            assert len(hits) == 3
+    finally:
+        stop.set()
+        thread.join()
+
+
+def test_load_racing_a_write_is_not_cached(memory_table):
+    engine = memory_table(_memory_rows(3))
+    client = engine._get_client()
+    load = engine._load_embedding_matrix
+
+    def load_during_write(c):
+        index = load(c)
+        engine._invalidate_embeddings()  # a background write lands mid-load
+        return index
+
+    engine._load_embedding_matrix = load_during_write
+    assert len(engine._search_local(client, _vec(1.0), 3)) == 3
+    assert engine._emb_index is None
+    engine._load_embedding_matrix = load
+    engine._search_local(client, _vec(1.0), 3)
+    assert engine._emb_index is not None
+
+
+def test_background_extraction_drops_the_search_cache(memory_table, fake_llm):
+    fake_llm()
+    engine = memory_table(_memory_rows(3))
+    engine._has_dedup_rpc = False
+    engine._backfilled = True
+    engine._extract_facts = lambda user, reply: [
+        {"fact": "sows wheat in November", "category": "crops", "importance": 6}
+    ]
+    written = []
+
+    def flush(rows):
+        written.extend(rows)
+        engine._invalidate_embeddings()
+        return rows
+
+    engine._flush_rows = flush
+    engine._search_local(engine._get_client(), _vec(1.0), 3)
+    assert engine._emb_index is not None
+    stored = engine.add_from_conversation_async("When do I sow?", "In November.").result(5)
+    assert [r["content"] for r in written] == ["sows wheat in November"]
+    assert [m["content"] for m in stored] == ["sows wheat in November"]
+    assert engine._emb_index is None
+
+
+def test_evicted_engine_keeps_working(monkeypatch):
+    monkeypatch.setattr(memory_engine, "_engines", memory_engine.LRUCache(maxsize=1))
+    first = memory_engine.get_memory_engine("a")
+    first._short_term.append({"role": "user", "content": "hello"})
+    memory_engine.get_memory_engine("b")
+    assert memory_engine.get_memory_engine("a") is not first
+    assert len(first._short_term) == 1
+
+
+# ═══════════════════════════════════════════════════════════════════════
+#  translation_service
+# ═══════════════════════════════════════════════════════════════════════
+
+@pytest.mark.parametrize(
+    ("text", "expected"),
+    [
+        ("My tomato leaves have spots", "en"),
+        ("नमस्ते किसान", "hi"),
+        ("నా టమాటాలలో ఆకు మచ్చలు", "te"),
+        ("வணக்கம்", "ta"),
+        ("rice price? আজকের দাম", "bn"),
+        ("ਸਤ ਸ੍ਰੀ ਅਕਾਲ", "pa"),
+    ],
+)
+def test_detect_by_script(text, expected):
+    assert TranslationService._detect_by_script(text) == expected
+
+
+class _EchoTranslator:
+    """Returns its input after a little jitter, so pool workers finish out
+    of order like real network calls."""
+
+    def __init__(self, calls: list[str]) -> None:
+        self.calls = calls
+
+    def translate(self, text: str) -> str:
+        time.sleep(random.random() / 100)
+        self.calls.append(text)
+        return text
+
+
+def test_do_translate_chunks_long_text_by_paragraph(monkeypatch):
+    calls: list[str] = []
+    monkeypatch.setattr(
+        translation_service, "_get_translator", lambda src, tgt: _EchoTranslator(calls)
+    )
+    paragraphs = [f"{i} " + "x" * 998 for i in range(10)]
+    text = "\n".join(paragraphs)
+
+    result = TranslationService._do_translate.__wrapped__(text, "en", "hi")
+
+    # Chunks finish in any order but are rejoined in input order
+    assert result == text
+    assert len(calls) > 1
+    assert all(len(c) <= 4500 for c in calls)
+    # Chunks split only at paragraph boundaries
+    chunks = sorted(calls, key=lambda c: int(c.split(" ", 1)[0]))
+    assert [p for c in chunks for p in c.split("\n")] == paragraphs
+
+
+def test_do_translate_short_text_is_one_call(monkeypatch):
+    calls: list[str] = []
+    monkeypatch.setattr(
+        translation_service, "_get_translator", lambda src, tgt: _EchoTranslator(calls)
+    )
+    assert TranslationService._do_translate.__wrapped__("hello\nworld", "en", "te") == "hello\nworld"
+    assert calls == ["hello\nworld"]